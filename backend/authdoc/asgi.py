@@ -4,6 +4,12 @@ ASGI config for AuthDoc project.
 This file exposes the ASGI callable as a module-level variable named `application`.
 It allows Django to handle asynchronous requests (e.g., WebSockets or async views).
 
+Serving through ASGI is what lets the async verification view
+(POST /api/verify/aadhaar/async/) keep many ML-service calls in flight
+per worker over one pooled connection set:
+
+    uvicorn authdoc.asgi:application --host 0.0.0.0 --port 8000
+
 For more information, see:
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -168,3 +168,45 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # ===============================
 # URL used by backend to contact ML-service inside Docker network
 ML_SERVICE_URL = os.getenv('ML_SERVICE_URL', 'http://mlservice:5000')
+
+# Timeouts (seconds) for full and preliminary (cheap checks only) requests
+ML_SERVICE_TIMEOUT = float(os.getenv('ML_SERVICE_TIMEOUT', '180'))
+ML_PRELIMINARY_TIMEOUT = float(os.getenv('ML_PRELIMINARY_TIMEOUT', '10'))
+
+# Connection pool to ML-service (shared requests.Session / httpx.AsyncClient)
+ML_CLIENT_MAX_CONNECTIONS = int(os.getenv('ML_CLIENT_MAX_CONNECTIONS', '100'))
+ML_CLIENT_MAX_KEEPALIVE = int(os.getenv('ML_CLIENT_MAX_KEEPALIVE', '20'))
+ML_CLIENT_KEEPALIVE_SECONDS = float(os.getenv('ML_CLIENT_KEEPALIVE_SECONDS', '30'))
+# HTTP/2 is negotiated over TLS only; plain-http ML_SERVICE_URLs stay on
+# keep-alive HTTP/1.1
+ML_CLIENT_HTTP2 = os.getenv('ML_CLIENT_HTTP2', '0') == '1'
+
+# How documents reach the ML-service:
+#   "upload" → multipart upload of the file bytes
+#   "shared" → storage paths only; the ML-service must mount MEDIA_ROOT
+#              (ML_SHARED_MEDIA_ROOT) and maps the files without copying
+ML_TRANSPORT = os.getenv('ML_TRANSPORT', 'upload')
+
+
+# ===============================
+# Verification Mode
+# ===============================
+# "full"        → respond once every ML check has finished
+# "progressive" → respond with a provisional score from the cheap checks,
+#                 then refine the record in the background
+# "queued"      → respond 202 with the record id at once; a background
+#                 worker runs the checks (poll /api/verify/results/<id>/)
+VERIFICATION_MODE = os.getenv('VERIFICATION_MODE', 'full')
+
+
+# ===============================
+# Verification Job Queue
+# ===============================
+# Worker threads inside each web process (0 = only standalone workers,
+# started with `python manage.py run_verification_workers`)
+VERIFICATION_WORKERS = int(os.getenv('VERIFICATION_WORKERS', '4'))
+# Idle wait between queue scans (seconds)
+VERIFICATION_POLL_SECONDS = float(os.getenv('VERIFICATION_POLL_SECONDS', '2'))
+# A claimed record not finished after this long is requeued (seconds)
+VERIFICATION_JOB_TIMEOUT = float(os.getenv('VERIFICATION_JOB_TIMEOUT', str(ML_SERVICE_TIMEOUT + 60)))
+VERIFICATION_MAX_ATTEMPTS = int(os.getenv('VERIFICATION_MAX_ATTEMPTS', '3'))
@@ -48,6 +48,8 @@ class VerificationRecordAdmin(admin.ModelAdmin):
     # Read-only fields (useful for immutable data)
     readonly_fields = (
         "created_at",
+        "updated_at",
+        "attempts",
     )
 
     # Customize detail view layout
@@ -67,7 +69,10 @@ class VerificationRecordAdmin(admin.ModelAdmin):
                 "result",
             ),
         }),
+        ("Background Processing", {
+            "fields": ("attempts", "error"),
+        }),
         ("Timestamps", {
-            "fields": ("created_at",),
+            "fields": ("created_at", "updated_at"),
         }),
     )
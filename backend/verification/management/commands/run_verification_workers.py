@@ -0,0 +1,40 @@
+"""
+run_verification_workers
+------------------------
+Standalone consumer for the verification job queue.
+
+    python manage.py run_verification_workers --workers 8
+
+Runs worker threads that claim Pending / Provisional records from the
+database and complete them through the ML-service. Any number of these
+processes can run next to the web server (set VERIFICATION_WORKERS=0 on
+the web processes to leave all ML calls to them).
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from verification.utils.jobs import VerificationWorkers
+
+
+class Command(BaseCommand):
+    help = "Processes queued Aadhaar verifications in the background."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=max(1, settings.VERIFICATION_WORKERS),
+            help="Number of worker threads (default: VERIFICATION_WORKERS).",
+        )
+        parser.add_argument(
+            "--poll", type=float, default=settings.VERIFICATION_POLL_SECONDS,
+            help="Seconds between queue scans when idle.",
+        )
+
+    def handle(self, *args, **options):
+        workers = VerificationWorkers(options["workers"], options["poll"])
+        workers.start()
+        try:
+            workers.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping verification workers...")
+            workers.stop()
+            workers.join()
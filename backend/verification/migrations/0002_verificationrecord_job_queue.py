@@ -0,0 +1,33 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('verification', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='verificationrecord',
+            name='status',
+            field=models.CharField(db_index=True, default='Pending', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='verificationrecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='verificationrecord',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='verificationrecord',
+            name='error',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -36,9 +36,15 @@ class VerificationRecord(models.Model):
     # Classification: Authentic / Suspicious / Forged
     result = models.CharField(max_length=20, blank=True, null=True)
 
-    # Status and timestamps
-    status = models.CharField(max_length=20, default='Pending')
+    # Status and timestamps (the status doubles as the job queue state,
+    # see verification/utils/jobs.py)
+    status = models.CharField(max_length=20, default='Pending', db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Background processing: worker claims so far and the last failure
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
 
     def __str__(self):
         return f"{self.user.username} - Aadhaar: {self.aadhaar_number} ({self.result or 'Not Verified'})"
@@ -34,6 +34,7 @@ class VerificationRecordSerializer(serializers.ModelSerializer):
             "final_score",
             "result",
             "status",
+            "error",
             "created_at",
             "updated_at",
         ]
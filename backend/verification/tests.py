@@ -0,0 +1,42 @@
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from .models import VerificationRecord
+from .utils import jobs
+
+
+@override_settings(ML_TRANSPORT="shared")
+class VerificationWorkerTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username="worker-test", password="secret")
+        self.records = [
+            VerificationRecord.objects.create(
+                user=user, document=f"documents/{index}.jpg",
+                aadhaar_number="234123412346", status="Pending",
+            )
+            for index in range(2)
+        ]
+
+    def run_worker_until_idle(self):
+        workers = jobs.VerificationWorkers(workers=1, poll_seconds=0)
+        # Stop as soon as the queue is empty instead of waiting for more work
+        workers._wake = mock.Mock(wait=lambda timeout: workers._stop.set())
+        # The test transaction must stay open
+        with mock.patch.object(jobs, "close_old_connections"):
+            workers._run()
+
+    def test_worker_survives_failing_error_save(self):
+        """A failure while recording a failure must not kill the worker."""
+        with mock.patch(
+            "verification.utils.ml_client.call_ml_service", side_effect=ConnectionError("down")
+        ) as call, mock.patch.object(
+            VerificationRecord, "save", side_effect=OperationalError("database is locked")
+        ):
+            self.run_worker_until_idle()
+
+        self.assertEqual(call.call_count, 2)
+        for record in self.records:
+            record.refresh_from_db()
+            self.assertEqual(record.attempts, 1)
+            self.assertEqual(record.status, "Processing")  # left for requeue_stale()
@@ -7,6 +7,7 @@ to the corresponding Django REST framework views.
 """
 
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
 from . import views
 
 urlpatterns = [
@@ -14,6 +15,11 @@ urlpatterns = [
     # Handles Aadhaar document upload and verification
     path("aadhaar/", views.AadhaarVerificationView.as_view(), name="aadhaar-verification"),
 
+    # POST: /api/verify/aadhaar/async/
+    # Native async variant (pooled httpx client, async ORM); serve under ASGI
+    # (JWT-authenticated like the DRF views, so CSRF does not apply)
+    path("aadhaar/async/", csrf_exempt(views.AsyncAadhaarVerificationView.as_view()), name="aadhaar-verification-async"),
+
     # GET: /api/verify/results/<int:pk>/
     # Fetch specific verification result by ID (optional)
     path("results/<int:pk>/", views.VerificationResultView.as_view(), name="verification-result"),
@@ -6,7 +6,9 @@ verification operations such as scoring, preprocessing,
 and integration with ML services.
 
 Modules:
-- scoring.py → Combines per-metric verification results into a final score.
+- scoring.py    → Combines per-metric verification results into a final score.
+- ml_client.py  → Calls the ML-service and stores its results on a record.
+- jobs.py       → Database-backed job queue and verification workers.
 """
 
 from .scoring import calculate_final_score  # Re-export for convenience
@@ -0,0 +1,186 @@
+"""
+jobs.py
+-------
+Database-backed verification job queue.
+
+A VerificationRecord is its own job; its status is the queue state:
+
+    Pending     → queued for a full ML-service run (mode="queued")
+    Provisional → has a provisional score, queued for refinement
+                  (mode="progressive")
+    Processing / Refining → claimed by a worker
+    Completed / Error     → finished
+
+Workers claim a record with a conditional UPDATE on its status, so any
+number of worker threads and processes can share the same database
+without a broker. Records whose worker died are put back in the queue
+once they have been claimed for longer than VERIFICATION_JOB_TIMEOUT,
+up to VERIFICATION_MAX_ATTEMPTS times.
+
+Workers run either inside the web process (started on first use, see
+wake()) or standalone via `python manage.py run_verification_workers`.
+"""
+
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+# Queued status → status while a worker holds the record
+QUEUED = {"Pending": "Processing", "Provisional": "Refining"}
+CLAIMED = {claimed: queued for queued, claimed in QUEUED.items()}
+
+
+# ===============================
+# Claiming
+# ===============================
+def claim_next():
+    """Atomically claims the oldest queued record; returns it or None."""
+    from ..models import VerificationRecord
+
+    candidates = (
+        VerificationRecord.objects.filter(status__in=QUEUED)
+        .order_by("created_at")
+        .values_list("pk", "status")[:10]
+    )
+    for pk, queued_status in candidates:
+        claimed = VerificationRecord.objects.filter(pk=pk, status=queued_status).update(
+            status=QUEUED[queued_status],
+            attempts=F("attempts") + 1,
+            updated_at=timezone.now(),
+        )
+        if claimed:
+            return VerificationRecord.objects.get(pk=pk)
+    return None
+
+
+def requeue_stale():
+    """
+    Puts records back whose worker stopped reporting (crash, restart).
+    Only records a worker claimed (attempts > 0) are touched: "Processing"
+    records of the synchronous request path are not jobs.
+    """
+    from ..models import VerificationRecord
+
+    cutoff = timezone.now() - timedelta(seconds=settings.VERIFICATION_JOB_TIMEOUT)
+    stale = VerificationRecord.objects.filter(
+        status__in=CLAIMED, attempts__gt=0, updated_at__lt=cutoff
+    )
+    for claimed_status, queued_status in CLAIMED.items():
+        stale.filter(status=claimed_status, attempts__lt=settings.VERIFICATION_MAX_ATTEMPTS).update(
+            status=queued_status, updated_at=timezone.now()
+        )
+    stale.filter(attempts__gte=settings.VERIFICATION_MAX_ATTEMPTS).update(
+        status="Error", error="Verification did not finish in time.", updated_at=timezone.now()
+    )
+
+
+# ===============================
+# Processing
+# ===============================
+def process_record(record):
+    """Runs the full ML-service pass for a claimed record and stores it."""
+    from .ml_client import call_ml_service, record_inputs, apply_ml_results
+
+    try:
+        files, refs = record_inputs(record)
+        ml_data = call_ml_service(
+            record.aadhaar_number, files,
+            tier="full", timeout=settings.ML_SERVICE_TIMEOUT, refs=refs,
+        )
+        results = apply_ml_results(record, ml_data, status="Completed")
+        print(f"[Jobs] Record {record.pk}: {results['classification']} ({results['final_score']})")
+    except Exception as e:
+        # Provisional scores (if any) are kept; the status records the failure
+        print(f"[Jobs] Record {record.pk} failed: {e}")
+        record.status = "Error"
+        record.error = str(e)
+        record.save(update_fields=["status", "error", "updated_at"])
+
+
+class VerificationWorkers:
+    """
+    Pool of threads that claim and process queued records.
+
+    Args:
+        workers (int): Number of worker threads.
+        poll_seconds (float): Idle wait between queue scans (enqueue wakes
+            the workers immediately in the same process).
+    """
+
+    def __init__(self, workers: int, poll_seconds: float):
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"verify-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        print(f"[Jobs] Started {self.workers} verification workers")
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def join(self):
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            close_old_connections()
+            try:
+                requeue_stale()
+                record = claim_next()
+            except Exception as e:
+                print(f"[Jobs] Queue scan failed: {e}")
+                record = None
+
+            if record is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            try:
+                process_record(record)
+            except Exception as e:
+                # e.g. saving the failure itself hit a locked / dropped DB:
+                # the record is requeued by requeue_stale(), the worker lives on
+                print(f"[Jobs] Record {record.pk} could not be finished: {e}")
+                close_old_connections()
+        close_old_connections()
+
+
+# ===============================
+# In-process Workers
+# ===============================
+_workers = None
+_workers_lock = threading.Lock()
+
+
+def wake():
+    """
+    Signals that a record was queued. Starts the in-process workers on
+    first use (unless VERIFICATION_WORKERS is 0, i.e. only standalone
+    worker processes consume the queue).
+    """
+    global _workers
+    if settings.VERIFICATION_WORKERS <= 0:
+        return
+    with _workers_lock:
+        if _workers is None:
+            _workers = VerificationWorkers(
+                settings.VERIFICATION_WORKERS, settings.VERIFICATION_POLL_SECONDS
+            )
+            _workers.start()
+    _workers.wake()
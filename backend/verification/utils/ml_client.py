@@ -0,0 +1,235 @@
+"""
+ml_client.py
+------------
+Talks to the ML-service and writes its results onto a VerificationRecord.
+
+Both the request/response views and the background workers use these
+helpers, so a record is always filled in the same way whichever path
+produced its scores.
+
+Documents travel one of two ways (settings.ML_TRANSPORT):
+    upload → multipart file upload (default)
+    shared → only storage paths (document_ref / template_ref) are sent;
+             the ML-service maps the files from the media volume it shares
+             with the backend, so no document bytes cross the network
+
+Connections are pooled and kept alive in both flavours:
+    sync  → one shared requests.Session (views under WSGI, job workers)
+    async → one shared httpx.AsyncClient per event loop (async view
+            under ASGI), bounded by ML_CLIENT_MAX_CONNECTIONS
+
+Under WSGI every async request runs on its own short-lived event loop, so
+there is nothing to share: async_client() then hands out a client that is
+closed again with the request.
+"""
+
+import asyncio
+import contextlib
+import json
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from .scoring import calculate_final_score, score_policy
+
+METRICS = ("verhoeff", "layout", "text", "copy_move", "metadata", "ela")
+
+
+# ===============================
+# ML-service Request
+# ===============================
+class MLServiceError(Exception):
+    """Raised when the ML-service returns an error response."""
+
+    def __init__(self, status_code: int, details: str):
+        super().__init__(f"ML-service returned {status_code}")
+        self.status_code = status_code
+        self.details = details
+
+
+def _form_data(aadhaar_number: str, tier: str, refs: dict = None) -> dict:
+    return {
+        "aadhaar_number": aadhaar_number,
+        "tier": tier,
+        # ML-service skips checks that cannot change our classification
+        "score_policy": json.dumps(score_policy()),
+        **(refs or {}),
+    }
+
+
+_sync_session = None
+
+
+def _session() -> requests.Session:
+    global _sync_session
+    if _sync_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=settings.ML_CLIENT_MAX_KEEPALIVE
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _sync_session = session
+    return _sync_session
+
+
+def call_ml_service(aadhaar_number: str, files: dict, tier: str = "full", timeout: float = 180,
+                    refs: dict = None) -> dict:
+    """
+    Posts a document to /verify/aadhaar and returns the decoded JSON.
+
+    Args:
+        files (dict): Multipart files, e.g. {"document": (name, bytes, type)}.
+        tier (str): "full" (all checks) or "preliminary" (cheap checks only).
+        refs (dict): Shared-volume references sent instead of files
+            (see shared_refs()).
+
+    Raises:
+        MLServiceError: When the ML-service answers with a non-200 status.
+    """
+    ml_url = f"{settings.ML_SERVICE_URL}/verify/aadhaar"
+    response = _session().post(ml_url, files=files or None, data=_form_data(aadhaar_number, tier, refs), timeout=timeout)
+    if response.status_code != 200:
+        raise MLServiceError(response.status_code, response.text)
+    return response.json()
+
+
+# ===============================
+# Async ML-service Request
+# ===============================
+# An AsyncClient's connections belong to the event loop that opened them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _new_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=settings.ML_SERVICE_URL,
+        http2=settings.ML_CLIENT_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.ML_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.ML_CLIENT_MAX_KEEPALIVE,
+            keepalive_expiry=settings.ML_CLIENT_KEEPALIVE_SECONDS,
+        ),
+        # Waiting for a free pooled connection counts against the same budget
+        timeout=httpx.Timeout(settings.ML_SERVICE_TIMEOUT, connect=5.0),
+    )
+
+
+def get_async_client():
+    """
+    Shared, connection-pooled httpx.AsyncClient for the running loop.
+    Only for loops that outlive a request (ASGI server); see async_client().
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = _new_async_client()
+        _async_clients[loop] = client
+    return client
+
+
+@contextlib.asynccontextmanager
+async def async_client(persistent_loop: bool):
+    """
+    Yields the shared client of the running loop when that loop persists
+    across requests (ASGI); otherwise a client that is closed on exit, so
+    per-request loops (async views under WSGI) do not leak connections.
+    """
+    if persistent_loop:
+        yield get_async_client()
+        return
+    client = _new_async_client()
+    try:
+        yield client
+    finally:
+        await client.aclose()
+
+
+async def acall_ml_service(aadhaar_number: str, files: dict, tier: str = "full", timeout: float = 180,
+                           refs: dict = None, client: httpx.AsyncClient = None) -> dict:
+    """
+    Async call_ml_service() over `client` (default: the pooled client of
+    the running loop).
+    """
+    client = client or get_async_client()
+    response = await client.post(
+        "/verify/aadhaar", files=files or None, data=_form_data(aadhaar_number, tier, refs), timeout=timeout
+    )
+    if response.status_code != 200:
+        raise MLServiceError(response.status_code, response.text)
+    return response.json()
+
+
+def record_files(record) -> dict:
+    """Multipart files for a record, read back from media storage."""
+    files = {}
+    for field in ("document", "template"):
+        stored = getattr(record, field)
+        if stored:
+            with stored.open("rb") as f:
+                files[field] = (f"{field}.jpg", f.read(), "image/jpeg")
+    return files
+
+
+def shared_refs(record) -> dict:
+    """
+    References to a record's stored files (paths relative to MEDIA_ROOT),
+    for an ML-service that mounts the same media volume.
+    """
+    return {
+        f"{field}_ref": getattr(record, field).name
+        for field in ("document", "template")
+        if getattr(record, field)
+    }
+
+
+def record_inputs(record) -> tuple:
+    """(files, refs) for a stored record, following settings.ML_TRANSPORT."""
+    if settings.ML_TRANSPORT == "shared":
+        return {}, shared_refs(record)
+    return record_files(record), None
+
+
+# ===============================
+# Apply Results to a Record
+# ===============================
+def _set_ml_results(record, ml_data: dict, status: str) -> dict:
+    results = calculate_final_score(ml_data)
+
+    record.verhoeff_score = ml_data.get("verhoeff")
+    record.layout_score = ml_data.get("layout")
+    record.text_score = ml_data.get("text")
+    record.copy_move_score = ml_data.get("copy_move")
+    record.metadata_score = ml_data.get("metadata")
+    record.ela_score = ml_data.get("ela")
+    record.final_score = results["final_score"]
+    record.result = results["classification"]
+    record.status = status
+    return results
+
+
+def apply_ml_results(record, ml_data: dict, status: str) -> dict:
+    """
+    Stores per-metric scores, the final score and classification on the
+    record (metrics the ML-service did not run stay None) and saves it.
+    Returns the calculate_final_score() result.
+    """
+    results = _set_ml_results(record, ml_data, status)
+    record.save()
+    return results
+
+
+async def aapply_ml_results(record, ml_data: dict, status: str) -> dict:
+    """Async apply_ml_results() (saves with the async ORM)."""
+    results = _set_ml_results(record, ml_data, status)
+    await record.asave()
+    return results
+
+
+def scores_percent(ml_data: dict) -> dict:
+    """Per-metric scores on the 0–100 scale used by the frontend."""
+    return {
+        metric: None if ml_data.get(metric) is None else ml_data[metric] * 100
+        for metric in METRICS
+    }
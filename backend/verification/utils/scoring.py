@@ -5,6 +5,30 @@ Defines how individual verification scores from ML-service are
 combined into a final authenticity score and classification.
 """
 
+# Default weights (sum to 1.0)
+WEIGHTS = {
+    "verhoeff": 0.15,
+    "layout": 0.20,
+    "text": 0.20,
+    "copy_move": 0.15,
+    "metadata": 0.15,
+    "ela": 0.15
+}
+
+# (classification, minimum final score), best first; below all → "Forged"
+THRESHOLDS = [("Authentic", 0.7), ("Suspicious", 0.65)]
+
+
+def score_policy() -> dict:
+    """
+    Weights and thresholds sent to ML-service so it can skip checks that
+    can no longer change the classification computed here. Skipped
+    metrics come back as None and are left out of the weighted average,
+    which always stays within the bounds ML-service decided on.
+    """
+    return {"weights": WEIGHTS, "thresholds": THRESHOLDS}
+
+
 def calculate_final_score(scores: dict) -> dict:
     """
     Combines metric scores into a weighted final score (0–1 scale internally).
@@ -27,20 +51,10 @@ def calculate_final_score(scores: dict) -> dict:
         }
     """
 
-    # Default weights (sum to 1.0)
-    weights = {
-        "verhoeff": 0.15,
-        "layout": 0.20,
-        "text": 0.20,
-        "copy_move": 0.15,
-        "metadata": 0.15,
-        "ela": 0.15
-    }
-
     weighted_sum = 0
     total_weight = 0
 
-    for metric, weight in weights.items():
+    for metric, weight in WEIGHTS.items():
         value = scores.get(metric, None)
         if value is not None:
             weighted_sum += value * weight
@@ -54,12 +68,11 @@ def calculate_final_score(scores: dict) -> dict:
     # ===============================
     # Classification (based on 0–1 scale)
     # ===============================
-    if final_score >= 0.7:
-        classification = "Authentic"
-    elif final_score >= 0.65:
-        classification = "Suspicious"
-    else:
-        classification = "Forged"
+    classification = "Forged"
+    for label, minimum in THRESHOLDS:
+        if final_score >= minimum:
+            classification = label
+            break
 
     return {
         "final_score": final_score,
@@ -1,11 +1,84 @@
+import httpx
 import requests
+from asgiref.sync import sync_to_async
 from rest_framework import status, permissions, generics
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import JsonResponse
+from django.views import View
 from .models import VerificationRecord
-from .utils.scoring import calculate_final_score
 from .serializers import VerificationRecordSerializer
+from .utils.ml_client import (
+    call_ml_service, acall_ml_service, async_client, apply_ml_results, aapply_ml_results,
+    scores_percent, shared_refs, MLServiceError,
+)
+from .utils import jobs
+
+MODES = ("full", "progressive", "queued")
+
+
+# ===============================
+# Shared Request / Response Helpers
+# ===============================
+def upload_files(document, template) -> dict:
+    """Multipart files for the ML-service from the uploaded files."""
+    document.file.seek(0)
+    files = {
+        "document": ("document.jpg", document.file.read(), document.content_type or "image/jpeg"),
+    }
+    if template:
+        template.file.seek(0)
+        files["template"] = ("template.jpg", template.file.read(), template.content_type or "image/jpeg")
+    return files
+
+
+def ml_inputs(record, document, template) -> tuple:
+    """
+    (files, refs) for the ML-service: the uploads themselves, or only the
+    stored paths when it shares the media volume (settings.ML_TRANSPORT).
+    """
+    if settings.ML_TRANSPORT == "shared":
+        return {}, shared_refs(record)
+    return upload_files(document, template), None
+
+
+def ml_call_options(mode: str) -> tuple:
+    """(tier, timeout, record status after the call) for a mode."""
+    if mode == "progressive":
+        return "preliminary", settings.ML_PRELIMINARY_TIMEOUT, "Provisional"
+    return "full", settings.ML_SERVICE_TIMEOUT, "Completed"
+
+
+def unreachable_body(error: Exception) -> dict:
+    return {"error": "ML-service could not be reached.", "details": str(error)}
+
+
+def queued_body(record) -> dict:
+    return {
+        "id": record.id,
+        "aadhaar_number": record.aadhaar_number,
+        "status": record.status,
+        "status_url": f"/api/verify/results/{record.id}/",
+    }
+
+
+def result_body(record, ml_data: dict, results: dict) -> dict:
+    """Frontend response (scores on a 0–100 scale)."""
+    return {
+        "id": record.id,
+        "aadhaar_number": record.aadhaar_number,
+        "scores": scores_percent(ml_data),
+        "skipped": ml_data.get("skipped", []),
+        "pending": ml_data.get("pending", []),
+        "final_score": round(results["final_score"] * 100, 2),
+        "classification": results["classification"],
+        "status": record.status,
+    }
 
 
 class AadhaarVerificationView(APIView):
@@ -18,91 +91,174 @@ class AadhaarVerificationView(APIView):
             aadhaar_number: "123456789012"
             document: <file>
             template: <file> (optional)
+            mode: "full" | "progressive" | "queued"
+                  (optional, default settings.VERIFICATION_MODE)
+
+        "progressive" answers with a provisional score from the cheap
+        checks; "queued" answers 202 with the record id straight away.
+        Either way a background worker fills in the full result
+        (poll /api/verify/results/<id>/).
         """
         try:
             aadhaar_number = request.data.get("aadhaar_number")
             document = request.FILES.get("document")
             template = request.FILES.get("template", None)
+            mode = request.data.get("mode") or settings.VERIFICATION_MODE
 
             if not aadhaar_number or not document:
                 return Response(
                     {"error": "Aadhaar number and document are required."},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
+            if mode not in MODES:
+                return Response(
+                    {"error": "mode must be 'full', 'progressive' or 'queued'."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
 
-            # Step 1 — Create record
+            # Step 1 — Create record (queued records are picked up by a worker)
             record = VerificationRecord.objects.create(
                 user=request.user,
                 document=document,
                 template=template,
                 aadhaar_number=aadhaar_number,
-                status="Processing",
+                status="Pending" if mode == "queued" else "Processing",
             )
 
-            # Step 2 — Prepare files for ML-service
-            document.file.seek(0)
-            files = {
-                "document": ("document.jpg", document.file.read(), document.content_type or "image/jpeg"),
-            }
-            if template:
-                template.file.seek(0)
-                files["template"] = ("template.jpg", template.file.read(), template.content_type or "image/jpeg")
-
-            data = {"aadhaar_number": aadhaar_number}
+            if mode == "queued":
+                transaction.on_commit(jobs.wake)
+                return Response(queued_body(record), status=status.HTTP_202_ACCEPTED)
 
-            # Step 3 — Send to ML-service
-            ml_url = f"{settings.ML_SERVICE_URL}/verify/aadhaar"
-            response = requests.post(ml_url, files=files, data=data, timeout=180)
+            # Step 2 — Prepare files (or shared-volume references) for ML-service
+            files, refs = ml_inputs(record, document, template)
 
-            if response.status_code != 200:
+            # Step 3 — Send to ML-service (cheap checks only when progressive)
+            tier, timeout, record_status = ml_call_options(mode)
+            try:
+                ml_data = call_ml_service(aadhaar_number, files, tier=tier, timeout=timeout, refs=refs)
+            except MLServiceError as e:
                 record.status = "Error"
                 record.save()
                 return Response(
-                    {"error": "ML-service returned an error.", "details": response.text},
-                    status=response.status_code,
+                    {"error": "ML-service returned an error.", "details": e.details},
+                    status=e.status_code,
                 )
+            except requests.RequestException as e:
+                # Connection errors / timeouts: the record must not stay "Processing"
+                record.status = "Error"
+                record.error = str(e)
+                record.save()
+                return Response(unreachable_body(e), status=status.HTTP_502_BAD_GATEWAY)
 
-            # Step 4 — Process ML response
-            ml_data = response.json()
-            results = calculate_final_score(ml_data)
-
-            final_score_raw = results["final_score"]        # normalized 0–1
-            classification = results["classification"]
-
-            # Step 5 — Save to DB (keep 0–1 for DB)
-            record.verhoeff_score = ml_data.get("verhoeff")
-            record.layout_score = ml_data.get("layout")
-            record.text_score = ml_data.get("text")
-            record.copy_move_score = ml_data.get("copy_move")
-            record.metadata_score = ml_data.get("metadata")
-            record.ela_score = ml_data.get("ela")
-            record.final_score = final_score_raw
-            record.result = classification
-            record.status = "Completed"
-            record.save()
+            # Step 4 — Save to DB (keep 0–1 for DB)
+            results = apply_ml_results(record, ml_data, status=record_status)
+
+            # Step 5 — Provisional records are queued for refinement
+            if tier == "preliminary":
+                transaction.on_commit(jobs.wake)
 
             # Step 6 — Respond to frontend (scale 0–100)
+            return Response(result_body(record, ml_data, results), status=status.HTTP_200_OK)
+
+        except Exception as e:
+            print(f"[Error] Aadhaar verification failed: {e}")
             return Response(
-                {
-                    "aadhaar_number": aadhaar_number,
-                    "scores": {
-                        "verhoeff": (ml_data.get("verhoeff", 0) or 0) * 100,
-                        "layout": (ml_data.get("layout", 0) or 0) * 100,
-                        "text": (ml_data.get("text", 0) or 0) * 100,
-                        "copy_move": (ml_data.get("copy_move", 0) or 0) * 100,
-                        "metadata": (ml_data.get("metadata", 0) or 0) * 100,
-                        "ela": (ml_data.get("ela", 0) or 0) * 100,
-                    },
-                    "final_score": round(final_score_raw * 100, 2),
-                    "classification": classification,
-                    "status": "Completed",
-                },
-                status=status.HTTP_200_OK,
+                {"error": f"Unexpected error: {str(e)}"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
 
+
+class AsyncAadhaarVerificationView(View):
+    """
+    Native async twin of AadhaarVerificationView for ASGI deployments
+    (authdoc/asgi.py). While the ML-service works, the request is only an
+    awaiting coroutine: one worker holds many verifications in flight over
+    a shared keep-alive connection pool, with async ORM writes.
+    Same payload, modes and responses as the sync view.
+
+    Under WSGI (runserver / gunicorn sync workers) each request gets its
+    own event loop; the view still works but opens and closes a client
+    per request.
+    """
+
+    async def post(self, request):
+        """
+        POST /api/verify/aadhaar/async/
+        """
+        try:
+            # Same JWT authentication as the DRF views (user lookup hits the DB)
+            try:
+                authenticated = await sync_to_async(JWTAuthentication().authenticate)(request)
+            except AuthenticationFailed as e:
+                return JsonResponse({"error": str(e.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+            if authenticated is None:
+                return JsonResponse(
+                    {"error": "Authentication credentials were not provided."},
+                    status=status.HTTP_401_UNAUTHORIZED,
+                )
+            user = authenticated[0]
+
+            aadhaar_number = request.POST.get("aadhaar_number")
+            document = request.FILES.get("document")
+            template = request.FILES.get("template", None)
+            mode = request.POST.get("mode") or settings.VERIFICATION_MODE
+
+            if not aadhaar_number or not document:
+                return JsonResponse(
+                    {"error": "Aadhaar number and document are required."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if mode not in MODES:
+                return JsonResponse(
+                    {"error": "mode must be 'full', 'progressive' or 'queued'."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Step 1 — Create record (autocommit: visible to workers at once)
+            record = await VerificationRecord.objects.acreate(
+                user=user,
+                document=document,
+                template=template,
+                aadhaar_number=aadhaar_number,
+                status="Pending" if mode == "queued" else "Processing",
+            )
+
+            if mode == "queued":
+                jobs.wake()
+                return JsonResponse(queued_body(record), status=status.HTTP_202_ACCEPTED)
+
+            # Step 2-3 — Send to ML-service over the pooled async client
+            files, refs = ml_inputs(record, document, template)
+            tier, timeout, record_status = ml_call_options(mode)
+            try:
+                async with async_client(isinstance(request, ASGIRequest)) as client:
+                    ml_data = await acall_ml_service(
+                        aadhaar_number, files, tier=tier, timeout=timeout, refs=refs, client=client
+                    )
+            except MLServiceError as e:
+                record.status = "Error"
+                await record.asave()
+                return JsonResponse(
+                    {"error": "ML-service returned an error.", "details": e.details},
+                    status=e.status_code,
+                )
+            except httpx.HTTPError as e:
+                record.status = "Error"
+                record.error = str(e)
+                await record.asave()
+                return JsonResponse(unreachable_body(e), status=status.HTTP_502_BAD_GATEWAY)
+
+            # Step 4-5 — Save to DB; provisional records are queued for refinement
+            results = await aapply_ml_results(record, ml_data, status=record_status)
+            if tier == "preliminary":
+                jobs.wake()
+
+            # Step 6 — Respond to frontend (scale 0–100)
+            return JsonResponse(result_body(record, ml_data, results), status=status.HTTP_200_OK)
+
         except Exception as e:
             print(f"[Error] Aadhaar verification failed: {e}")
-            return Response(
+            return JsonResponse(
                 {"error": f"Unexpected error: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
@@ -110,16 +266,25 @@ class AadhaarVerificationView(APIView):
 
 class VerificationResultView(generics.RetrieveAPIView):
     """
-    Retrieve a completed verification record by ID.
+    Retrieve a verification record by ID: its status while queued
+    (Pending / Processing / Provisional / Refining) and its scores once
+    Completed. Users only see their own records.
     """
     queryset = VerificationRecord.objects.all()
     serializer_class = VerificationRecordSerializer
     permission_classes = [permissions.IsAuthenticated]
     lookup_field = "pk"
 
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return self.queryset
+        return self.queryset.filter(user=self.request.user)
+
     def get(self, request, *args, **kwargs):
         try:
             instance = self.get_object()
+            if instance.status in jobs.QUEUED:
+                jobs.wake()  # make sure a worker is running in this process
             serializer = self.get_serializer(instance)
             return Response(serializer.data, status=status.HTTP_200_OK)
         except VerificationRecord.DoesNotExist:
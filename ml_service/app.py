@@ -1,17 +1,32 @@
-from fastapi import FastAPI, UploadFile, Form
-from fastapi.responses import JSONResponse
-from concurrent.futures import ThreadPoolExecutor
+# config must come first: it exports the OpenMP/BLAS thread budget
+# before numpy / torch are imported by the verifiers
+import config
+from fastapi import FastAPI, UploadFile, Form, File
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.formparsers import MultiPartParser
+from typing import List
+import asyncio
+import json
+import threading
+import time
 import uvicorn
-import os
 
 # Import all verifiers and utilities
 from verifiers.verhoeff import verhoeff_check
-from verifiers.layout_check import layout_similarity
+from verifiers.layout_check import layout_similarity, layout_batcher
 from verifiers.text_check import text_match
 from verifiers.copy_move import copy_move_detection
 from verifiers.metadata_check import metadata_analysis
 from verifiers.ela_check import ela_analysis
-from utils.helpers import save_temp_file
+from utils.helpers import read_upload_bytes, save_temp_file, resolve_shared_path
+from utils.batch import UploadBatch, ArchiveBatch, BatchError
+from utils.scheduler import VerifierScheduler
+from utils.scoring import WEIGHTS, THRESHOLDS
+from utils.document import DocumentContext
+from utils.execution import VerifierExecutor
+from utils.cpu_budget import apply_cpu_budget
+from utils.artifact_cache import default_artifact_cache
+from models import registry, model_stats, backbone_report
 
 # ===============================
 # Initialize FastAPI app
@@ -22,10 +37,231 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Keep typical scans (3–8 MB) in memory while the multipart body is parsed,
+# so an upload reaches the verifiers without a temp-file round trip
+MultiPartParser.spool_max_size = config.UPLOAD_SPOOL_MAX_MB * 2**20
+
 # ===============================
-# Thread Pool for Parallel Execution
+# CPU Budget + Verifier Pool
 # ===============================
-executor = ThreadPoolExecutor(max_workers=6)
+# Core pinning (ML_CPU_PIN_CORES) only applies to process-mode workers,
+# which pin themselves
+cpu_settings = apply_cpu_budget(config.CPU_BUDGET)
+
+executor = VerifierExecutor(
+    backend=config.EXECUTION_BACKEND,
+    thread_workers=config.THREAD_WORKERS,
+    process_workers=config.PROCESS_WORKERS,
+    process_verifiers=config.PROCESS_VERIFIERS,
+    preload_models=config.PRELOAD_MODELS,
+    library_threads=config.CPU_LIBRARY_THREADS,
+    pin_cores=config.CPU_PIN_CORES,
+)
+
+scheduler = VerifierScheduler(executor, cheap_ms=config.SCHEDULER_CHEAP_MS)
+
+
+# ===============================
+# Background Model Warm-up
+# ===============================
+startup_timing = {}
+
+
+def _warm_models():
+    start = time.perf_counter()
+    if executor.processes is not None:
+        # Models live in the worker processes; start them all and wait
+        registry.report_errors(executor.warm_up())
+        ready = registry.warm_up([])
+    else:
+        ready = registry.warm_up(config.PRELOAD_MODELS)
+    startup_timing["warmup_total_seconds"] = round(time.perf_counter() - start, 3)
+    if ready:
+        print(f"[Startup] Models ready in {startup_timing['warmup_total_seconds']:.2f}s")
+    else:
+        print(f"[Startup] Warm-up failed after {startup_timing['warmup_total_seconds']:.2f}s; "
+              f"/readyz stays 503 (degraded)")
+
+
+@app.on_event("startup")
+def start_model_warmup():
+    """
+    Loads and warms models on a background thread so uvicorn binds
+    immediately; /readyz reports ready once warm-up has finished.
+    """
+    if config.WARMUP_ON_STARTUP:
+        threading.Thread(target=_warm_models, name="model-warmup", daemon=True).start()
+    else:
+        registry.warm_up([])
+
+
+@app.on_event("shutdown")
+def stop_verifier_pool():
+    executor.shutdown()
+
+
+# ===============================
+# Verifier Dispatch Helpers
+# ===============================
+# Checks that can return their statistics on request (details=...)
+DETAIL_CHECKS = ("ela",)
+
+
+def verifier_calls(doc, tmpl, aadhaar_number: str, tier: str = "full", details=()) -> dict:
+    """
+    The checks as {name: (function, args)}, in response order. The
+    preliminary tier keeps only config.PRELIMINARY_VERIFIERS, with ELA on
+    a downscaled view. Checks named in `details` also return their
+    statistics (currently only "ela").
+    """
+    calls = {
+        "verhoeff": (verhoeff_check, (aadhaar_number,)),
+        "layout": (layout_similarity, (doc, tmpl)),
+        "text": (text_match, (doc, aadhaar_number, tmpl)),
+        "copy_move": (copy_move_detection, (doc,)),
+        "metadata": (metadata_analysis, (doc,)),
+        "ela": (ela_analysis, (doc, None, "ela" in details))
+    }
+    if tier == "preliminary":
+        calls["ela"] = (ela_analysis, (doc, config.ELA_PRELIMINARY_MAX_SIDE, "ela" in details))
+        calls = {name: call for name, call in calls.items() if name in config.PRELIMINARY_VERIFIERS}
+    return calls
+
+
+def parse_score_policy(raw: str) -> dict:
+    """
+    Reads the caller's scoring policy, used to decide when the result can
+    no longer change: {"weights": {name: w}, "thresholds": [[label, min], ...]}.
+    Defaults to utils/scoring.py; weights are normalized to sum to 1.0.
+    """
+    if not raw:
+        return {"weights": WEIGHTS, "thresholds": THRESHOLDS}
+    policy = json.loads(raw)
+    weights = {name: float(weight) for name, weight in policy.get("weights", WEIGHTS).items()}
+    total = sum(weights.values())
+    if set(weights) != set(WEIGHTS) or total <= 0:
+        raise ValueError(f"score_policy weights must cover {sorted(WEIGHTS)}")
+    thresholds = sorted(
+        ((str(label), float(minimum)) for label, minimum in policy.get("thresholds", THRESHOLDS)),
+        key=lambda item: -item[1],
+    )
+    return {"weights": {name: w / total for name, w in weights.items()}, "thresholds": thresholds}
+
+
+async def run_verifiers(doc, tmpl, aadhaar_number: str, early_exit: bool, policy: dict,
+                        tier: str = "full", on_result=None, details=()) -> dict:
+    """
+    Runs the checks (cheapest first, stopping early when allowed) against
+    one overall deadline. Skipped checks score None and are listed under
+    "skipped"; failed or timed-out checks score 0.0. In the preliminary
+    tier the checks left for the full pass score None and are listed
+    under "pending". Statistics of the checks named in `details` that ran
+    are returned under "details".
+    """
+    if executor.processes is not None:
+        # Copy into shared memory off the event loop; share() is cached
+        for context in (doc, tmpl):
+            if context is not None:
+                await asyncio.to_thread(context.share)
+
+    calls = verifier_calls(doc, tmpl, aadhaar_number, tier, details)
+    scores, skipped, check_details = await scheduler.run(
+        calls, timeout=config.REQUEST_TIMEOUT, early_exit=early_exit,
+        on_result=on_result, **policy
+    )
+
+    # Keep every metric key (in the usual order) whichever tier ran
+    all_checks = verifier_calls(doc, tmpl, aadhaar_number)
+    results = {name: scores.get(name) for name in all_checks}
+    results["skipped"] = skipped
+    results["tier"] = tier
+    if tier == "preliminary":
+        results["pending"] = [name for name in all_checks if name not in calls]
+    if details:
+        results["details"] = check_details
+    return results
+
+
+# ===============================
+# Streaming Responses
+# ===============================
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+
+def format_frame(frame: dict, fmt: str) -> str:
+    """One NDJSON line, or one Server-Sent Event named after frame["event"]."""
+    if fmt == "sse":
+        return f"event: {frame['event']}\ndata: {json.dumps(frame)}\n\n"
+    return json.dumps(frame) + "\n"
+
+
+async def stream_verification(contexts, verification, fmt: str):
+    """
+    Streams one "result" frame per verifier as soon as it settles
+    ({"name", "score", "status", "elapsed_ms"}), heartbeats while checks
+    are still running, and a final "summary" frame with the same body as
+    the non-streaming response. Closes the documents when done.
+
+    Args:
+        contexts (tuple): DocumentContexts to close once the stream ends.
+        verification: Coroutine function taking on_result (run_verifiers).
+        fmt (str): "ndjson" or "sse".
+    """
+    queue = asyncio.Queue()
+    start = time.perf_counter()
+
+    def on_result(name, score, status, seconds):
+        queue.put_nowait({
+            "event": "result",
+            "name": name,
+            "score": score,
+            "status": status,
+            "elapsed_ms": None if seconds is None else round(1000.0 * seconds, 1),
+        })
+
+    task = asyncio.create_task(verification(on_result))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while True:
+            try:
+                frame = await asyncio.wait_for(queue.get(), timeout=config.STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies / load balancers from treating a slow check as a hung response
+                yield ": keepalive\n\n" if fmt == "sse" else format_frame({"event": "heartbeat"}, fmt)
+                continue
+            if frame is None:
+                break
+            yield format_frame(frame, fmt)
+
+        elapsed_ms = round(1000.0 * (time.perf_counter() - start), 1)
+        try:
+            yield format_frame({"event": "summary", "results": task.result(), "elapsed_ms": elapsed_ms}, fmt)
+        except Exception as e:
+            print(f"[Error] Verification failed: {e}")
+            yield format_frame({"event": "error", "error": str(e), "elapsed_ms": elapsed_ms}, fmt)
+    finally:
+        if not task.done():
+            task.cancel()  # client disconnected
+        for context in contexts:
+            if context is not None:
+                context.close()
+
+
+# ===============================
+# Document Inputs
+# ===============================
+async def open_document(upload: UploadFile = None, reference: str = None):
+    """
+    DocumentContext for an uploaded file, or for a file referenced on the
+    shared media volume (memory-mapped, no copy). Raises ValueError for
+    invalid references.
+    """
+    if reference:
+        path = resolve_shared_path(reference, config.SHARED_MEDIA_ROOT)
+        return await asyncio.to_thread(DocumentContext.from_mapped, path)
+    if upload is not None:
+        return DocumentContext.from_bytes(await read_upload_bytes(upload), name=upload.filename)
+    return None
 
 
 # ===============================
@@ -35,48 +271,88 @@ executor = ThreadPoolExecutor(max_workers=6)
 async def verify_aadhaar(
     aadhaar_number: str = Form(...),
     document: UploadFile = None,
-    template: UploadFile = None
+    template: UploadFile = None,
+    early_exit: bool = Form(None),
+    score_policy: str = Form(None),
+    tier: str = Form("full"),
+    stream: str = Form(None),
+    document_ref: str = Form(None),
+    template_ref: str = Form(None),
+    details: str = Form(None)
 ):
     """
     Receives an Aadhaar image and template, performs multiple forgery checks,
-    and returns metric scores in JSON format.
+    and returns metric scores in JSON format. With early exit (default
+    config.EARLY_EXIT) checks that cannot change the classification under
+    `score_policy` are skipped and listed under "skipped".
+
+    tier="preliminary" runs only the cheap checks (verhoeff, metadata,
+    downscaled ELA) for an instant provisional score; the caller follows
+    up with a tier="full" request for the refined result.
+
+    stream="ndjson" or "sse" streams each verifier's result as soon as it
+    completes, followed by a summary frame (see stream_verification).
+
+    Instead of uploading, the backend may pass document_ref / template_ref:
+    storage paths on the media volume mounted at config.SHARED_MEDIA_ROOT.
+
+    details="ela" adds "details": {"ela": ...} with the ELA error
+    statistics per JPEG quality and the worst tiles (localized evidence).
     """
 
-    if not aadhaar_number or not document:
+    if not aadhaar_number or not (document or document_ref):
         return JSONResponse(
             {"error": "Missing Aadhaar number or document file."},
             status_code=400
         )
 
-    # Save temporary files
-    doc_path = save_temp_file(document)
-    template_path = save_temp_file(template) if template else None
+    if tier not in ("full", "preliminary"):
+        return JSONResponse({"error": "tier must be 'full' or 'preliminary'."}, status_code=400)
+    if stream and stream not in STREAM_MEDIA_TYPES:
+        return JSONResponse({"error": "stream must be 'ndjson' or 'sse'."}, status_code=400)
+    details = tuple(name.strip() for name in (details or "").split(",") if name.strip())
+    if any(name not in DETAIL_CHECKS for name in details):
+        return JSONResponse({"error": f"details must name one of {list(DETAIL_CHECKS)}."}, status_code=400)
 
     try:
-        # Prepare verification tasks to run in parallel
-        tasks = {
-            "verhoeff": executor.submit(verhoeff_check, aadhaar_number),
-            "layout": executor.submit(layout_similarity, doc_path, template_path),
-            "text": executor.submit(text_match, doc_path, aadhaar_number),
-            "copy_move": executor.submit(copy_move_detection, doc_path),
-            "metadata": executor.submit(metadata_analysis, doc_path),
-            "ela": executor.submit(ela_analysis, doc_path)
-        }
-
-        # Collect results from all verifiers
-        results = {}
-        for name, task in tasks.items():
-            try:
-                results[name] = round(task.result(timeout=120), 3)
-            except Exception as e:
-                results[name] = 0.0  # Default to 0 if a module fails
-                print(f"[Warning] {name} check failed: {e}")
+        policy = parse_score_policy(score_policy)
+    except (ValueError, TypeError, AttributeError) as e:
+        return JSONResponse({"error": f"Invalid score_policy: {e}"}, status_code=400)
+
+    doc = tmpl = None
+    streaming = False
+    try:
+        # Shared per-request documents: each upload is held in memory (or each
+        # referenced file mapped), decoded once, and the same buffers are
+        # handed to every verifier
+        try:
+            doc = await open_document(document, document_ref)
+            tmpl = await open_document(template, template_ref)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        if doc is None:
+            return JSONResponse({"error": "Uploaded document is empty."}, status_code=400)
+
+        early_exit = config.EARLY_EXIT if early_exit is None else early_exit
+
+        if stream:
+            # The stream owns the documents from here and closes them itself
+            async def verification(on_result):
+                return await run_verifiers(
+                    doc, tmpl, aadhaar_number, early_exit, policy, tier, on_result, details
+                )
+
+            streaming = True
+            return StreamingResponse(
+                stream_verification((doc, tmpl), verification, stream),
+                media_type=STREAM_MEDIA_TYPES[stream],
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
 
-        # Cleanup temporary files
-        if os.path.exists(doc_path):
-            os.remove(doc_path)
-        if template_path and os.path.exists(template_path):
-            os.remove(template_path)
+        # Cheap checks first; expensive ones only if they can still matter
+        results = await run_verifiers(
+            doc, tmpl, aadhaar_number, early_exit, policy, tier, details=details
+        )
 
         # Return results as JSON
         return JSONResponse(results, status_code=200)
@@ -85,6 +361,125 @@ async def verify_aadhaar(
         print(f"[Error] Verification failed: {e}")
         return JSONResponse({"error": str(e)}, status_code=500)
 
+    finally:
+        # Release buffers and any spilled files even when a check raised
+        if not streaming:
+            for context in (doc, tmpl):
+                if context is not None:
+                    context.close()
+
+
+# ===============================
+# Route: Batch Aadhaar Verification
+# ===============================
+async def verify_batch_item(item, early_exit: bool, policy: dict) -> dict:
+    """Runs all checks for one batch item; errors are reported per item."""
+    start = time.perf_counter()
+    line = {"index": item.index, "id": item.item_id}
+    doc = None
+    try:
+        doc = await asyncio.to_thread(item.load_document)
+        if doc is None:
+            line.update(status="error", error="Document is empty.")
+            return line
+
+        results = await run_verifiers(doc, item.template, item.aadhaar_number, early_exit, policy)
+        line.update(status="ok", results=results)
+    except Exception as e:
+        print(f"[Batch] Item {item.index} ({item.item_id}) failed: {e}")
+        line.update(status="error", error=str(e))
+    finally:
+        if doc is not None:
+            doc.close()
+    line["elapsed_ms"] = round(1000.0 * (time.perf_counter() - start), 1)
+    return line
+
+
+async def stream_batch(batch, concurrency: int, early_exit: bool, policy: dict):
+    """
+    Keeps up to `concurrency` items in flight on the verifier pool (so
+    layout checks of different items share micro-batches) and yields one
+    NDJSON line per item as soon as it completes, in completion order.
+    """
+    pending = set()
+    completed = 0
+    start = time.perf_counter()
+    try:
+        for item in batch:
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    completed += 1
+                    yield json.dumps(task.result()) + "\n"
+            pending.add(asyncio.create_task(verify_batch_item(item, early_exit, policy)))
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                completed += 1
+                yield json.dumps(task.result()) + "\n"
+
+        elapsed = time.perf_counter() - start
+        print(f"[Batch] {completed} items in {elapsed:.2f}s ({completed / max(elapsed, 1e-9):.2f} items/s)")
+    finally:
+        # Client went away: stop scheduling and drop in-flight items
+        for task in pending:
+            task.cancel()
+        await asyncio.to_thread(batch.close)
+
+
+@app.post("/verify/aadhaar/batch")
+async def verify_aadhaar_batch(
+    aadhaar_numbers: List[str] = Form(None),
+    documents: List[UploadFile] = File(None),
+    templates: List[UploadFile] = File(None),
+    archive: UploadFile = File(None),
+    early_exit: bool = Form(None),
+    score_policy: str = Form(None),
+):
+    """
+    Verifies many documents in one upload and streams one NDJSON line
+    per item ({"index", "id", "status", "results", "elapsed_ms"}) as it
+    completes. Items are either parallel multipart fields or a zip
+    `archive` with a manifest (see utils/batch.py).
+    """
+    try:
+        policy = parse_score_policy(score_policy)
+    except (ValueError, TypeError, AttributeError) as e:
+        return JSONResponse({"error": f"Invalid score_policy: {e}"}, status_code=400)
+
+    try:
+        if archive is not None and archive.size is not None and archive.size <= MultiPartParser.spool_max_size:
+            # Held in memory like single documents (it was never spooled to disk)
+            batch = await asyncio.to_thread(ArchiveBatch, await read_upload_bytes(archive))
+        elif archive is not None:
+            # Too large to keep resident while the batch streams: the parser
+            # already spooled it to a temp file, which is closed once this
+            # handler returns, so it is copied to a file the batch owns
+            path = await asyncio.to_thread(save_temp_file, archive)
+            batch = await asyncio.to_thread(ArchiveBatch, path)
+        else:
+            batch = UploadBatch(
+                aadhaar_numbers,
+                [(d.filename, await read_upload_bytes(d)) for d in documents or []],
+                [(t.filename, await read_upload_bytes(t)) for t in templates or []],
+            )
+    except BatchError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    except Exception as e:
+        print(f"[Error] Batch upload failed: {e}")
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+    print(f"[Batch] Verifying {len(batch)} items ({config.BATCH_CONCURRENCY} in flight)")
+    return StreamingResponse(
+        stream_batch(
+            batch, config.BATCH_CONCURRENCY,
+            config.EARLY_EXIT if early_exit is None else early_exit, policy,
+        ),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Items": str(len(batch))},
+    )
+
 
 # ===============================
 # Root Endpoint
@@ -94,6 +489,53 @@ def root():
     return {"message": "AuthDoc ML-Service is running successfully."}
 
 
+# ===============================
+# Liveness / Readiness Probes
+# ===============================
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "alive"}
+
+
+@app.get("/readyz")
+def readyz():
+    """
+    Readiness: preloaded models are loaded and have run a warm-up pass.
+    A model that failed to load or warm up keeps this at 503 ("degraded").
+    """
+    if registry.ready:
+        state = "ready"
+    elif registry.warmed_up:
+        state = "degraded"
+    else:
+        state = "warming"
+    body = {
+        "status": state,
+        "startup": startup_timing,
+        "models": model_stats(),
+    }
+    if registry.warmup_errors():
+        body["errors"] = registry.warmup_errors()
+    return JSONResponse(body, status_code=200 if registry.ready else 503)
+
+
+# ===============================
+# Model Registry Stats
+# ===============================
+@app.get("/models")
+def models_info():
+    """Reports which shared models are loaded, their load time and memory."""
+    return {
+        "models": model_stats(),
+        "batching": {"layout": layout_batcher.stats()},
+        "layout_backbones": backbone_report(),
+        "cpu": cpu_settings,
+        "scheduler": scheduler.stats(),
+        "artifact_cache": cache.stats() if (cache := default_artifact_cache()) else None,
+    }
+
+
 # ===============================
 # Run (only for standalone testing)
 # ===============================
@@ -0,0 +1,249 @@
+"""
+config.py
+----------
+Runtime configuration for the ML service.
+
+All settings are read from environment variables (set them in
+docker-compose.yml or the container environment) with safe defaults.
+"""
+
+import os
+import json
+
+
+def _env_list(name: str, default: str) -> list:
+    value = os.getenv(name, default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+# ===============================
+# Inference Backend
+# ===============================
+# "torch" → eager float32 PyTorch
+# "onnx"  → ONNX Runtime (CPU provider) with int8 quantized ResNet / BERT
+INFERENCE_BACKEND = os.getenv("ML_INFERENCE_BACKEND", "torch")
+# "dynamic", "static" (needs ML_ONNX_CALIBRATION_DIR images) or "none"
+ONNX_QUANTIZATION = os.getenv("ML_ONNX_QUANTIZATION", "dynamic")
+# Exported / quantized graphs are cached here across restarts
+ONNX_MODEL_DIR = os.getenv("ML_ONNX_MODEL_DIR", "/tmp/authdoc_cache/onnx")
+ONNX_CALIBRATION_DIR = os.getenv("ML_ONNX_CALIBRATION_DIR", "")
+# Lowest torch-vs-ONNX cosine similarity check_parity() accepts per model
+ONNX_PARITY_MIN_COSINE = float(os.getenv("ML_ONNX_PARITY_MIN_COSINE", "0.99"))
+
+
+# ===============================
+# Layout Backbone
+# ===============================
+# Headless feature extractor for layout similarity: resnet50,
+# mobilenet_v3_large, mobilenet_v3_small, efficientnet_b0, structural_hash
+LAYOUT_BACKBONE = os.getenv("ML_LAYOUT_BACKBONE", "resnet50")
+LAYOUT_MODEL = f"layout_{LAYOUT_BACKBONE}" + ("_onnx" if INFERENCE_BACKEND == "onnx" else "")
+
+
+# ===============================
+# Model Warm-up
+# ===============================
+# Models loaded and warmed in the background right after the server binds.
+# /readyz reports ready only once all of these have finished.
+PRELOAD_MODELS = _env_list("ML_PRELOAD_MODELS", f"{LAYOUT_MODEL},easyocr")
+
+# Set to "0" to skip background warm-up (models then load on first use)
+WARMUP_ON_STARTUP = os.getenv("ML_WARMUP_ON_STARTUP", "1") == "1"
+
+
+# ===============================
+# Template Embedding Cache
+# ===============================
+# Template feature vectors are cached by content hash; the directory keeps
+# them across restarts (empty string = in-memory LRU only)
+TEMPLATE_CACHE_DIR = os.getenv("ML_TEMPLATE_CACHE_DIR", "/tmp/authdoc_cache/templates")
+TEMPLATE_CACHE_SIZE = int(os.getenv("ML_TEMPLATE_CACHE_SIZE", "64"))
+
+
+# ===============================
+# Layout Micro-batching
+# ===============================
+# Concurrent layout checks are gathered into one batched forward pass
+LAYOUT_BATCH_SIZE = int(os.getenv("ML_LAYOUT_BATCH_SIZE", "8"))
+LAYOUT_BATCH_WAIT_MS = float(os.getenv("ML_LAYOUT_BATCH_WAIT_MS", "10"))
+
+
+# ===============================
+# Text Matching
+# ===============================
+# "digits" (edit distance on OCR digit sequences), "digits+bert"
+# (BERT only when no digits are found) or "bert" (legacy embeddings)
+TEXT_MATCH_MODE = os.getenv("ML_TEXT_MATCH_MODE", "digits")
+
+
+# ===============================
+# Region-of-interest OCR
+# ===============================
+# "off"   → always OCR the full page
+# "auto"  → per-template regions if configured, else detect text boxes on
+#           a downscaled page and recognize only the number-shaped ones
+# "fixed" → per-template regions, else the "default" regions
+# Either ROI mode falls back to full-page OCR when no digits are found.
+OCR_ROI_MODE = os.getenv("ML_OCR_ROI_MODE", "auto")
+
+# Longest side (px) of the downscaled page used for text detection
+OCR_DETECT_MAX_SIDE = int(os.getenv("ML_OCR_DETECT_MAX_SIDE", "1280"))
+# "auto": how many detected bands that look like the number (a row of
+# 4-digit groups, else one 4-4-4 line) are recognized
+OCR_NUMBER_BANDS = int(os.getenv("ML_OCR_NUMBER_BANDS", "2"))
+
+# JSON object: {"<template sha256>" | "default": [[x0, y0, x1, y1], ...]}
+# with coordinates as fractions of the page width / height
+OCR_ROI_REGIONS = json.loads(os.getenv(
+    "ML_OCR_ROI_REGIONS",
+    '{"default": [[0.05, 0.55, 0.95, 0.95]]}'
+))
+
+
+# ===============================
+# Working Resolution per Verifier
+# ===============================
+# Longest image side (px) each check works at; 0 = full resolution.
+# Views come from a per-request image pyramid, so the cost of a check no
+# longer grows with the upload's megapixels.
+COPY_MOVE_MAX_SIDE = int(os.getenv("ML_COPY_MOVE_MAX_SIDE", "1600"))
+LAYOUT_MAX_SIDE = int(os.getenv("ML_LAYOUT_MAX_SIDE", "512"))
+OCR_MAX_SIDE = int(os.getenv("ML_OCR_MAX_SIDE", "2560"))
+# ELA measures JPEG re-compression error, which resampling smooths away;
+# keep it at full resolution unless a cap is explicitly configured
+ELA_MAX_SIDE = int(os.getenv("ML_ELA_MAX_SIDE", "0"))
+# Cap for the preliminary tier (tier=preliminary): a fast, coarser ELA
+ELA_PRELIMINARY_MAX_SIDE = int(os.getenv("ML_ELA_PRELIMINARY_MAX_SIDE", "1024"))
+
+
+# ===============================
+# Copy-move Detection
+# ===============================
+# ORB keypoints per image (matching is vectorized, so this can be high)
+COPY_MOVE_FEATURES = int(os.getenv("ML_COPY_MOVE_FEATURES", "5000"))
+
+
+# ===============================
+# Error Level Analysis
+# ===============================
+# JPEG qualities evaluated per request; the first one drives the score and
+# is the only one computed unless ELA details are requested (details=ela)
+ELA_QUALITIES = [int(q) for q in _env_list("ML_ELA_QUALITIES", "90,80,70")]
+# Tile size (px) for block-level error statistics in the details; 0 disables them
+ELA_BLOCK_SIZE = int(os.getenv("ML_ELA_BLOCK_SIZE", "32"))
+# Worst tiles (highest mean error) reported per quality
+ELA_TOP_BLOCKS = int(os.getenv("ML_ELA_TOP_BLOCKS", "5"))
+
+
+# ===============================
+# Verifier Execution Backend
+# ===============================
+# "thread"  → all verifiers on one thread pool
+# "process" → CPU-heavy verifiers on a pre-warmed process pool
+#             (documents passed through shared memory)
+EXECUTION_BACKEND = os.getenv("ML_EXECUTION_BACKEND", "thread")
+# 0 = derived from the CPU budget below
+THREAD_WORKERS = int(os.getenv("ML_THREAD_WORKERS", "0"))
+PROCESS_WORKERS = int(os.getenv("ML_PROCESS_WORKERS", "0"))
+PROCESS_VERIFIERS = _env_list("ML_PROCESS_VERIFIERS", "layout,text,copy_move,ela")
+
+# Overall deadline (seconds) for all verifiers of one request
+REQUEST_TIMEOUT = float(os.getenv("ML_REQUEST_TIMEOUT", "120"))
+
+
+# ===============================
+# Cost-aware Scheduling
+# ===============================
+# Cheap checks run first; expensive ones are skipped once the final
+# classification can no longer change ("0" = always run all six)
+EARLY_EXIT = os.getenv("ML_EARLY_EXIT", "1") == "1"
+# Checks with a typical cost up to this many ms form the cheap tier
+SCHEDULER_CHEAP_MS = float(os.getenv("ML_SCHEDULER_CHEAP_MS", "100"))
+
+# Checks run for tier=preliminary requests (instant provisional score)
+PRELIMINARY_VERIFIERS = _env_list("ML_PRELIMINARY_VERIFIERS", "verhoeff,metadata,ela")
+
+
+# ===============================
+# Shared Media Volume
+# ===============================
+# Where the backend's MEDIA_ROOT is mounted (read-only is enough). When
+# set, requests may pass document_ref / template_ref (storage paths)
+# instead of uploading the files; they are memory-mapped, not copied.
+SHARED_MEDIA_ROOT = os.getenv("ML_SHARED_MEDIA_ROOT", "")
+
+
+# ===============================
+# Streaming Responses
+# ===============================
+# Seconds between heartbeat frames while streamed checks (stream=ndjson|sse)
+# are still running
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("ML_STREAM_HEARTBEAT_SECONDS", "10"))
+
+
+# ===============================
+# Upload Handling
+# ===============================
+# Multipart parts up to this size stay in memory while the request body is
+# parsed (Starlette would spool anything above 1 MB to a temporary file);
+# larger parts still go to disk
+UPLOAD_SPOOL_MAX_MB = int(os.getenv("ML_UPLOAD_SPOOL_MAX_MB", "32"))
+
+
+# ===============================
+# Batch Verification
+# ===============================
+# Items of a /verify/aadhaar/batch upload verified concurrently; enough
+# in flight to fill a layout micro-batch without flooding the pool
+BATCH_CONCURRENCY = int(os.getenv("ML_BATCH_CONCURRENCY", str(max(LAYOUT_BATCH_SIZE, 2))))
+
+
+# ===============================
+# CPU Thread Budget
+# ===============================
+# One budget shared by the verifier pool and the threads torch, OpenCV
+# and OpenMP/BLAS may each use per call: workers x library threads ≈ cores.
+# 0 = derive automatically.
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))  # respects taskset / cpusets
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+CPU_TOTAL_CORES = int(os.getenv("ML_CPU_CORES", "0")) or _available_cores()
+CPU_LIBRARY_THREADS = int(os.getenv("ML_CPU_LIBRARY_THREADS", "0"))
+# Pin each worker process (ML_EXECUTION_BACKEND=process) to its own cores; ignored in
+# thread mode, where every verifier shares one process
+CPU_PIN_CORES = os.getenv("ML_CPU_PIN_CORES", "0") == "1"
+
+if EXECUTION_BACKEND == "process":
+    PROCESS_WORKERS = PROCESS_WORKERS or max(1, CPU_TOTAL_CORES // (CPU_LIBRARY_THREADS or 1))
+    CPU_LIBRARY_THREADS = CPU_LIBRARY_THREADS or max(1, CPU_TOTAL_CORES // PROCESS_WORKERS)
+    # Only cheap checks stay on threads in process mode
+    THREAD_WORKERS = THREAD_WORKERS or 2
+else:
+    THREAD_WORKERS = THREAD_WORKERS or max(1, min(6, CPU_TOTAL_CORES // (CPU_LIBRARY_THREADS or 1)))
+    CPU_LIBRARY_THREADS = CPU_LIBRARY_THREADS or max(1, CPU_TOTAL_CORES // THREAD_WORKERS)
+
+CPU_BUDGET = {
+    "total_cores": CPU_TOTAL_CORES,
+    "verifier_workers": PROCESS_WORKERS if EXECUTION_BACKEND == "process" else THREAD_WORKERS,
+    "library_threads": CPU_LIBRARY_THREADS,
+}
+
+# OpenMP / BLAS read these once when they load, so they are exported here,
+# before anything imports numpy or torch (explicit env settings still win)
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS",
+             "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS"):
+    os.environ.setdefault(_var, str(CPU_LIBRARY_THREADS))
+
+
+# ===============================
+# Verifier Artifact Cache
+# ===============================
+# OCR text, layout embeddings, ORB keypoints and ELA statistics are cached
+# by image SHA-256 + verifier version; LRU-evicted above the size limit.
+# Empty directory disables the cache.
+ARTIFACT_CACHE_DIR = os.getenv("ML_ARTIFACT_CACHE_DIR", "/tmp/authdoc_cache/artifacts")
+ARTIFACT_CACHE_MAX_MB = int(os.getenv("ML_ARTIFACT_CACHE_MAX_MB", "512"))
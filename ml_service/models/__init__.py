@@ -1,45 +1,147 @@
 """
 ML Models Package
 -----------------
-This package contains pre-trained or fine-tuned models used by
-the ML verification service for document authentication tasks.
+This package owns the pre-trained models used by the ML verification
+service for document authentication tasks.
 
-These may include:
-- Deep learning models (ResNet, BERT, Sentence-BERT)
-- OCR and embedding extractors
-- Template or reference embeddings for layout comparison
+Every model is registered once in a shared ModelRegistry and loaded
+lazily on first use, so each one is held in memory exactly once no
+matter how many verifiers borrow it:
+
+- layout_<backbone> → headless layout feature extractor (see backbones.py)
+- easyocr  → EasyOCR English reader used for text extraction
+- bert     → (tokenizer, model) pair for bert-base-uncased
+- sbert    → Sentence-BERT 'paraphrase-MiniLM-L6-v2'
+- layout_<backbone>_onnx / bert_onnx → int8-quantized ONNX Runtime
+  versions of the above, used when config.INFERENCE_BACKEND is "onnx"
+
+Modules:
+    registry.py     → ModelRegistry implementation
+    batching.py     → Cross-request micro-batching for inference
+    backbones.py    → Pluggable headless backbones for layout similarity
+    onnx_backend.py → ONNX export, quantization and parity check
 """
 
-import torch
-from torchvision import models
-from torchvision.models import ResNet50_Weights
-from sentence_transformers import SentenceTransformer
+import warnings
+from .registry import ModelRegistry
+from .batching import MicroBatcher
+from .backbones import BACKBONES, load_backbone, backbone_report
+
+warnings.filterwarnings("ignore", category=UserWarning)
+
+
+# ==============================================================
+# Model Loaders (heavy imports happen only when a model is needed)
+# ==============================================================
+def get_device():
+    import torch
+    return torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def _load_easyocr():
+    import easyocr
+    return easyocr.Reader(['en'], gpu=False)
+
+
+def _load_bert():
+    from transformers import BertTokenizer, BertModel
+
+    tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
+    model = BertModel.from_pretrained('bert-base-uncased')
+    model.eval()
+    return tokenizer, model
+
+
+def _load_sbert():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer('paraphrase-MiniLM-L6-v2')
+
+
+# ==============================================================
+# Warm-up Passes (one dummy forward so lazy init is paid at startup)
+# ==============================================================
+def _warm_backbone(model):
+    import torch
+    with torch.no_grad():
+        model(torch.zeros(1, 3, 224, 224, device=get_device()))
+
+
+def _warm_easyocr(reader):
+    import numpy as np
+    reader.readtext(np.full((64, 256, 3), 255, dtype=np.uint8))
+
+
+def _warm_bert(bert):
+    import torch
+    tokenizer, model = bert
+    with torch.no_grad():
+        model(**tokenizer("0000 0000 0000", return_tensors="pt"))
+
+
+def _warm_sbert(model):
+    model.encode(["warm-up"])
+
+
+def _load_bert_onnx():
+    from .onnx_backend import load_bert_onnx
+    return load_bert_onnx()
+
+
+def _warm_backbone_onnx(model):
+    import numpy as np
+    model(np.zeros((1, 3, 224, 224), dtype=np.float32))
+
+
+def _warm_bert_onnx(model):
+    model.embed("0000 0000 0000")
+
 
 # ==============================================================
-# Preload and manage ML models used across multiple verifiers
+# Shared registry instance
 # ==============================================================
+def _backbone_loaders(name: str):
+    def load():
+        return load_backbone(name)
+
+    def load_onnx():
+        from .onnx_backend import load_backbone_onnx
+        return load_backbone_onnx(name)
+
+    return load, load_onnx
+
+
+registry = ModelRegistry()
+registry.register("easyocr", _load_easyocr, warmup=_warm_easyocr)
+registry.register("bert", _load_bert, warmup=_warm_bert)
+registry.register("sbert", _load_sbert, warmup=_warm_sbert)
+registry.register("bert_onnx", _load_bert_onnx, warmup=_warm_bert_onnx)
+for _name in BACKBONES:
+    _load, _load_onnx = _backbone_loaders(_name)
+    registry.register(f"layout_{_name}", _load, warmup=_warm_backbone)
+    registry.register(f"layout_{_name}_onnx", _load_onnx, warmup=_warm_backbone_onnx)
+
+
+def get_model(name: str):
+    """Borrows the shared handle for a registered model (loads on first use)."""
+    return registry.get(name)
+
 
-# Load ResNet-50 model as a feature extractor for layout similarity
-try:
-    resnet_model = models.resnet50(weights=ResNet50_Weights.IMAGENET1K_V1)
-    resnet_model.fc = torch.nn.Identity()  # Remove classification head
-    resnet_model.eval()
-except Exception as e:
-    print(f"[Warning] Failed to load ResNet50 model: {e}")
-    resnet_model = None
+def model_stats() -> dict:
+    """Returns per-model load state, load time and parameter memory."""
+    return registry.stats()
 
-# Load Sentence-BERT model for text and semantic similarity
-try:
-    sentence_model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-except Exception as e:
-    print(f"[Warning] Failed to load Sentence-BERT model: {e}")
-    sentence_model = None
 
 # ==============================================================
 # Define accessible module exports
 # ==============================================================
 
 __all__ = [
-    "resnet_model",
-    "sentence_model",
+    "ModelRegistry",
+    "MicroBatcher",
+    "BACKBONES",
+    "backbone_report",
+    "registry",
+    "get_model",
+    "get_device",
+    "model_stats",
 ]
@@ -0,0 +1,145 @@
+"""
+backbones.py
+-------------
+Pluggable feature extractors for layout similarity.
+
+Every backbone is headless: it returns penultimate-layer (globally
+pooled) embeddings, never ImageNet class logits. All take the same
+ImageNet-normalized 3x224x224 input, so preprocessing and micro-batching
+are shared. Pick one with config.LAYOUT_BACKBONE; each is registered in
+the model registry as "layout_<name>".
+
+    resnet50          → 2048-d, ~25.6M params (original model)
+    mobilenet_v3_large→  960-d, ~5.5M params
+    mobilenet_v3_small→  576-d, ~2.5M params
+    efficientnet_b0   → 1280-d, ~5.3M params
+    structural_hash   →  512-d, no params (pooled intensity + gradient grid)
+
+Measured per-image cost is recorded for each backbone as it runs and
+reported by backbone_report().
+"""
+
+import threading
+
+
+# ===============================
+# Backbone Loaders (headless)
+# ===============================
+def _resnet50():
+    import torch
+    from torchvision import models
+    from torchvision.models import ResNet50_Weights
+
+    model = models.resnet50(weights=ResNet50_Weights.IMAGENET1K_V1)
+    model.fc = torch.nn.Identity()  # Remove classification head
+    return model
+
+
+def _mobilenet_v3_large():
+    import torch
+    from torchvision import models
+    from torchvision.models import MobileNet_V3_Large_Weights
+
+    model = models.mobilenet_v3_large(weights=MobileNet_V3_Large_Weights.IMAGENET1K_V1)
+    model.classifier = torch.nn.Identity()
+    return model
+
+
+def _mobilenet_v3_small():
+    import torch
+    from torchvision import models
+    from torchvision.models import MobileNet_V3_Small_Weights
+
+    model = models.mobilenet_v3_small(weights=MobileNet_V3_Small_Weights.IMAGENET1K_V1)
+    model.classifier = torch.nn.Identity()
+    return model
+
+
+def _efficientnet_b0():
+    import torch
+    from torchvision import models
+    from torchvision.models import EfficientNet_B0_Weights
+
+    model = models.efficientnet_b0(weights=EfficientNet_B0_Weights.IMAGENET1K_V1)
+    model.classifier = torch.nn.Identity()
+    return model
+
+
+def _structural_hash():
+    import torch
+    import torch.nn.functional as F
+
+    class StructuralHash(torch.nn.Module):
+        """
+        Parameter-free layout descriptor: a 16x16 grid of mean intensity
+        plus a 16x16 grid of gradient magnitude, each mean-centred so
+        cosine similarity compares structure rather than brightness.
+        """
+
+        def __init__(self, grid: int = 16):
+            super().__init__()
+            self.grid = grid
+            sobel = torch.tensor([[-1.0, 0.0, 1.0], [-2.0, 0.0, 2.0], [-1.0, 0.0, 1.0]])
+            self.register_buffer("kernel", torch.stack([sobel, sobel.t()]).unsqueeze(1))
+
+        def forward(self, x):
+            gray = x.mean(dim=1, keepdim=True)
+            gradients = F.conv2d(gray, self.kernel, padding=1)
+            magnitude = gradients.pow(2).sum(dim=1, keepdim=True).sqrt()
+            parts = []
+            for channel in (gray, magnitude):
+                pooled = F.adaptive_avg_pool2d(channel, self.grid).flatten(1)
+                parts.append(pooled - pooled.mean(dim=1, keepdim=True))
+            return torch.cat(parts, dim=1)
+
+    return StructuralHash()
+
+
+BACKBONES = {
+    "resnet50": {"loader": _resnet50, "dim": 2048},
+    "mobilenet_v3_large": {"loader": _mobilenet_v3_large, "dim": 960},
+    "mobilenet_v3_small": {"loader": _mobilenet_v3_small, "dim": 576},
+    "efficientnet_b0": {"loader": _efficientnet_b0, "dim": 1280},
+    "structural_hash": {"loader": _structural_hash, "dim": 512},
+}
+
+
+def load_backbone(name: str):
+    """Builds a headless backbone in eval mode on the service device."""
+    from models import get_device
+
+    if name not in BACKBONES:
+        raise KeyError(f"Unknown layout backbone: {name}")
+    model = BACKBONES[name]["loader"]()
+    model.eval()
+    model.to(get_device())
+    return model
+
+
+# ===============================
+# Per-image Cost Tracking
+# ===============================
+_costs = {}
+_costs_lock = threading.Lock()
+
+
+def record_cost(name: str, images: int, seconds: float):
+    """Adds one measured forward pass (of `images` images) to the stats."""
+    with _costs_lock:
+        entry = _costs.setdefault(name, {"images": 0, "seconds": 0.0})
+        entry["images"] += images
+        entry["seconds"] += seconds
+
+
+def backbone_report() -> dict:
+    """Lists every backbone with its embedding size and measured ms/image."""
+    report = {}
+    with _costs_lock:
+        for name, spec in BACKBONES.items():
+            entry = {"dim": spec["dim"]}
+            measured = _costs.get(name)
+            if measured and measured["images"]:
+                entry["images"] = measured["images"]
+                entry["ms_per_image"] = round(1000.0 * measured["seconds"] / measured["images"], 2)
+            report[name] = entry
+    return report
@@ -0,0 +1,110 @@
+"""
+batching.py
+------------
+Cross-request micro-batching for model inference.
+
+Verifier threads submit single preprocessed inputs; a dedicated worker
+thread gathers whatever arrives within a short window (up to a maximum
+batch size), runs one batched forward pass, and hands each caller its
+own row of the output. On CPU this replaces several competing
+batch-size-1 forwards with a single, better-vectorized one.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """
+    Gathers concurrent single-item inference calls into batches.
+
+    Args:
+        name (str): Label used in log lines and stats.
+        run_batch (callable): Takes a list of inputs, returns a sequence
+            of outputs of the same length and order.
+        max_batch_size (int): Upper bound on items per forward pass.
+        max_wait_ms (float): How long to wait for more items after the
+            first one arrives before running a partial batch.
+    """
+
+    def __init__(self, name: str, run_batch, max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    # ===============================
+    # Public API
+    # ===============================
+    def submit(self, item) -> Future:
+        """Queues one input and returns a Future for its output."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def infer(self, item, timeout: float = None):
+        """Blocking convenience wrapper around submit()."""
+        return self.submit(item).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    # ===============================
+    # Worker Loop
+    # ===============================
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name=f"batcher-{self.name}", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            # Skip callers that already gave up (timed out / cancelled)
+            batch = [(item, fut) for item, fut in batch if fut.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            try:
+                outputs = self.run_batch([item for item, _ in batch])
+                for (_, fut), output in zip(batch, outputs):
+                    fut.set_result(output)
+            except Exception as e:
+                print(f"[Batcher:{self.name}] Batch of {len(batch)} failed: {e}")
+                for _, fut in batch:
+                    fut.set_exception(e)
+
+            self.batches += 1
+            self.items += len(batch)
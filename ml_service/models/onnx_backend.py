@@ -0,0 +1,309 @@
+"""
+onnx_backend.py
+----------------
+Quantized ONNX Runtime inference backend for the layout and text models.
+
+When config.INFERENCE_BACKEND is "onnx", the layout backbone
+(config.LAYOUT_BACKBONE, see backbones.py) and BERT are exported
+to ONNX once (cached in config.ONNX_MODEL_DIR), quantized to int8, and
+served by ONNX Runtime's CPU execution provider instead of eager float32
+PyTorch. The torch model is only constructed when an export is needed.
+
+Quantization modes (config.ONNX_QUANTIZATION):
+    "dynamic" → int8 weights, activations quantized on the fly (default)
+    "static"  → int8 weights and activations, calibrated on the images in
+                config.ONNX_CALIBRATION_DIR (layout only; BERT stays dynamic)
+    "none"    → plain float32 ONNX graph
+
+check_parity() compares the ONNX and torch outputs on the same inputs
+for the models the configuration actually serves (BERT only outside
+the "digits" text mode) and fails any model below
+config.ONNX_PARITY_MIN_COSINE; run
+`python -m models.onnx_backend` (exit status 1 on failure) before
+switching ML_INFERENCE_BACKEND to "onnx".
+"""
+
+import os
+import numpy as np
+import config
+
+
+# ===============================
+# Session Helpers
+# ===============================
+def _session(path: str):
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = config.CPU_LIBRARY_THREADS
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def _model_path(name: str, mode: str) -> str:
+    os.makedirs(config.ONNX_MODEL_DIR, exist_ok=True)
+    return os.path.join(config.ONNX_MODEL_DIR, f"{name}-{mode}.onnx")
+
+
+def _quantize(float_path: str, out_path: str, mode: str, calibration_reader=None):
+    from onnxruntime.quantization import quantize_dynamic, quantize_static, QuantType
+
+    if mode == "static":
+        quantize_static(float_path, out_path, calibration_reader,
+                        weight_type=QuantType.QInt8, activation_type=QuantType.QUInt8)
+    else:
+        quantize_dynamic(float_path, out_path, weight_type=QuantType.QInt8)
+
+
+def _build(name: str, export, calibration_reader_factory=None) -> str:
+    """
+    Exports (float32) and quantizes a model once; returns the final path.
+    The cached graph is named after the quantization actually applied, so
+    a dynamic fallback is never reused once calibration data exists.
+    """
+    mode = config.ONNX_QUANTIZATION
+    reader = None
+    if mode == "static":
+        reader = calibration_reader_factory() if calibration_reader_factory else None
+        if reader is None:
+            print(f"[ONNX] No calibration data for static quantization of {name}, using dynamic.")
+            mode = "dynamic"
+
+    float_path = os.path.join(config.ONNX_MODEL_DIR, f"{name}-float32.onnx")
+    path = float_path if mode == "none" else _model_path(name, mode)
+    if os.path.exists(path):
+        return path
+
+    if not os.path.exists(float_path):
+        os.makedirs(config.ONNX_MODEL_DIR, exist_ok=True)
+        print(f"[ONNX] Exporting {name} to {float_path}")
+        export(float_path)
+    if mode == "none":
+        return float_path
+
+    tmp_path = f"{path}.tmp"
+    _quantize(float_path, tmp_path, mode, reader)
+    os.replace(tmp_path, path)
+    print(f"[ONNX] Quantized {name} ({mode}) → {path}")
+    return path
+
+
+# ===============================
+# Layout Backbones
+# ===============================
+class OnnxImageModel:
+    """Callable wrapper: float32 NCHW batch (np.ndarray) → output array."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.session = _session(path)
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch.astype(np.float32, copy=False)})[0]
+
+
+class _ImageCalibrationReader:
+    """Feeds preprocessed calibration images to quantize_static."""
+
+    def __init__(self, paths, input_name: str = "input"):
+        self.paths = list(paths)
+        self.input_name = input_name
+
+    def get_next(self):
+        from utils.document import DocumentContext
+        from verifiers.layout_check import preprocess
+
+        while self.paths:
+            document = DocumentContext.from_path(self.paths.pop())
+            if document is None or document.rgb is None:
+                continue
+            return {self.input_name: preprocess(document.rgb).unsqueeze(0).numpy()}
+        return None
+
+
+def _image_calibration_reader():
+    directory = config.ONNX_CALIBRATION_DIR
+    if not directory or not os.path.isdir(directory):
+        return None
+    paths = [os.path.join(directory, f) for f in sorted(os.listdir(directory))]
+    return _ImageCalibrationReader(paths) if paths else None
+
+
+def load_backbone_onnx(name: str):
+    """ONNX Runtime version of a headless layout backbone."""
+    def export(path: str):
+        import torch
+        from models import load_backbone
+
+        model = load_backbone(name).cpu()
+        torch.onnx.export(
+            model, torch.zeros(1, 3, 224, 224), path,
+            input_names=["input"], output_names=["output"],
+            dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+            opset_version=17,
+        )
+
+    return OnnxImageModel(_build(f"layout_{name}", export, _image_calibration_reader))
+
+
+# ===============================
+# BERT (text similarity)
+# ===============================
+class OnnxBert:
+    """Mean-pooled BERT sentence embeddings from an ONNX Runtime session."""
+
+    def __init__(self, path: str, tokenizer):
+        self.path = path
+        self.tokenizer = tokenizer
+        self.session = _session(path)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def embed(self, text: str) -> np.ndarray:
+        inputs = self.tokenizer(text, return_tensors="np", padding=True,
+                                truncation=True, max_length=512)
+        feeds = {k: v.astype(np.int64) for k, v in inputs.items() if k in self.input_names}
+        hidden = self.session.run(None, feeds)[0]
+        return hidden.mean(axis=1)
+
+
+def _export_bert(path: str):
+    import torch
+    from models import _load_bert
+
+    tokenizer, model = _load_bert()
+    sample = tokenizer("0000 0000 0000", return_tensors="pt")
+    axes = {0: "batch", 1: "sequence"}
+    torch.onnx.export(
+        model,
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        path,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": axes, "attention_mask": axes, "token_type_ids": axes,
+            "last_hidden_state": axes,
+        },
+        opset_version=17,
+    )
+
+
+def load_bert_onnx():
+    from transformers import BertTokenizer
+
+    # Static quantization needs image calibration data; BERT stays dynamic
+    path = _build("bert", _export_bert)
+    return OnnxBert(path, BertTokenizer.from_pretrained('bert-base-uncased'))
+
+
+# ===============================
+# Accuracy Parity Check
+# ===============================
+def _cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / (np.linalg.norm(a, axis=1, keepdims=True) + 1e-12)
+    b = b / (np.linalg.norm(b, axis=1, keepdims=True) + 1e-12)
+    return (a * b).sum(axis=1)
+
+
+def active_models() -> list:
+    """Models the current configuration serves through ONNX Runtime."""
+    names = [f"layout_{config.LAYOUT_BACKBONE}"]
+    if config.TEXT_MATCH_MODE != "digits":  # BERT is never loaded in digits mode
+        names.append("bert")
+    return names
+
+
+def _layout_parity(backbone: str, samples: int, rng) -> dict:
+    import torch
+    from models import get_model, get_device
+
+    reader = _image_calibration_reader()
+    batch = []
+    while reader is not None and len(batch) < samples:
+        item = reader.get_next()
+        if item is None:
+            break
+        batch.append(item["input"][0])
+    if not batch:
+        batch = list(rng.standard_normal((samples, 3, 224, 224)).astype(np.float32))
+    images = np.stack(batch).astype(np.float32)
+
+    torch_model, onnx_model = get_model(backbone), get_model(f"{backbone}_onnx")
+    if torch_model is None or onnx_model is None:
+        raise RuntimeError(f"{backbone} could not be loaded")
+    with torch.no_grad():
+        reference = torch_model(torch.from_numpy(images).to(get_device())).cpu().numpy()
+    candidate = onnx_model(images)
+    return {
+        "min_cosine": float(_cosine(reference, candidate).min()),
+        "max_abs_diff": float(np.abs(reference - candidate).max()),
+    }
+
+
+def _bert_parity(samples: int, rng) -> dict:
+    import torch
+    from models import get_model
+
+    bert, onnx_bert = get_model("bert"), get_model("bert_onnx")
+    if bert is None or onnx_bert is None:
+        raise RuntimeError("bert could not be loaded")
+    tokenizer, bert_model = bert
+    texts = [" ".join(str(d) for d in rng.integers(0, 10, 12)) for _ in range(samples)]
+    texts += ["GOVERNMENT OF INDIA", "Aadhaar - Aam Aadmi ka Adhikar"]
+    cosines = []
+    for text in texts:
+        with torch.no_grad():
+            ref = bert_model(**tokenizer(text, return_tensors="pt")).last_hidden_state.mean(dim=1).numpy()
+        cosines.append(float(_cosine(ref, onnx_bert.embed(text))[0]))
+    return {"min_cosine": min(cosines)}
+
+
+def active_models() -> list:
+    """Models the current configuration serves through ONNX Runtime."""
+    names = [f"layout_{config.LAYOUT_BACKBONE}"]
+    if config.TEXT_MATCH_MODE != "digits":  # BERT is never loaded in digits mode
+        names.append("bert")
+    return names
+
+
+def check_parity(samples: int = 8, seed: int = 0, min_cosine: float = None, models=None) -> dict:
+    """
+    Runs the torch and ONNX paths on the same inputs and reports the
+    minimum cosine similarity and max absolute difference per model.
+    Images come from config.ONNX_CALIBRATION_DIR if set, else random noise.
+    Only `models` (default: active_models()) are exported and checked.
+
+    A model passes when its minimum cosine is at least `min_cosine`
+    (default config.ONNX_PARITY_MIN_COSINE); report["passed"] is True
+    only if every model passes.
+    """
+    min_cosine = config.ONNX_PARITY_MIN_COSINE if min_cosine is None else min_cosine
+    models = active_models() if models is None else list(models)
+    rng = np.random.default_rng(seed)
+
+    report = {}
+    for name in models:
+        try:
+            if name == "bert":
+                report[name] = _bert_parity(samples, rng)
+            else:
+                report[name] = _layout_parity(name, samples, rng)
+        except Exception as e:
+            # A model that cannot be loaded or exported cannot pass
+            report[name] = {"error": str(e), "passed": False}
+            continue
+        report[name]["passed"] = report[name]["min_cosine"] >= min_cosine
+
+    return {"min_cosine": min_cosine, "models": report,
+            "passed": all(result["passed"] for result in report.values())}
+
+
+if __name__ == "__main__":
+    import sys
+
+    parity = check_parity()
+    for model_name, result in parity["models"].items():
+        print(f"[Parity] {model_name}: {'PASS' if result['passed'] else 'FAIL'} {result}")
+    print(f"[Parity] {'PASS' if parity['passed'] else 'FAIL'} (min cosine {parity['min_cosine']})")
+    sys.exit(0 if parity["passed"] else 1)
@@ -0,0 +1,212 @@
+"""
+registry.py
+------------
+Process-wide registry of the heavy ML models used by the verifiers.
+
+Each model is registered once with a loader function and is only
+constructed the first time a verifier borrows it. Load time and an
+estimate of resident parameter memory are recorded per model so the
+service can report what it is actually holding.
+
+Models may also register a warm-up function (a dummy forward pass).
+warm_up() loads and warms a set of models, typically from a background
+thread at startup, and flips the registry to ready once it is done —
+unless a model failed to load or to warm up, in which case the registry
+stays not-ready and the failures are reported by warmup_errors().
+"""
+
+import os
+import threading
+import time
+
+
+class ModelRegistry:
+    """
+    Owns every shared model instance in the ML service.
+
+    Usage:
+        registry.register("resnet50", load_resnet50, warmup=warm_resnet50)
+        model = registry.get("resnet50")   # loads on first call
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._warmups = {}
+        self._models = {}
+        self._stats = {}
+        self._errors = {}
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._warmed_up = threading.Event()
+        self._warmup_errors = {}
+
+    # ===============================
+    # Registration
+    # ===============================
+    def register(self, name: str, loader, warmup=None):
+        """
+        Registers a zero-argument loader under the given model name.
+        The optional warmup callable receives the loaded model.
+        """
+        with self._lock:
+            self._loaders[name] = loader
+            if warmup is not None:
+                self._warmups[name] = warmup
+
+    def names(self) -> list:
+        return list(self._loaders.keys())
+
+    # ===============================
+    # Lazy Access
+    # ===============================
+    def get(self, name: str):
+        """
+        Returns the shared instance of a model, loading it on first use.
+        Returns None (and remembers the error) if the model cannot be loaded.
+        """
+        if name in self._models:
+            return self._models[name]
+
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+            if name in self._errors:
+                return None
+            if name not in self._loaders:
+                raise KeyError(f"Unknown model: {name}")
+
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                print(f"[Models] Failed to load {name}: {e}")
+                self._errors[name] = str(e)
+                return None
+
+            elapsed = time.perf_counter() - start
+            self._models[name] = model
+            self._stats[name] = {
+                "load_seconds": round(elapsed, 3),
+                "param_bytes": _estimate_bytes(model),
+            }
+            print(f"[Models] Loaded {name} in {elapsed:.2f}s "
+                  f"({self._stats[name]['param_bytes'] / 2**20:.1f} MiB)")
+            return model
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    # ===============================
+    # Startup Warm-up
+    # ===============================
+    def warm_up(self, names=None) -> bool:
+        """
+        Loads the given models (default: all registered) and runs each
+        model's warm-up pass once. Marks the registry ready when finished,
+        provided no model has failed (here or via report_errors()).
+        Returns True if the registry is ready.
+        """
+        names = list(names) if names is not None else self.names()
+        for name in names:
+            if name not in self._loaders:
+                print(f"[Models] Skipping warm-up of unknown model: {name}")
+                self._warmup_errors[name] = "unknown model"
+                continue
+            model = self.get(name)
+            if model is None:
+                self._warmup_errors[name] = f"load failed: {self._errors.get(name)}"
+                continue
+
+            warmup = self._warmups.get(name)
+            if warmup is None or "warmup_seconds" in self._stats[name]:
+                continue
+
+            start = time.perf_counter()
+            try:
+                warmup(model)
+            except Exception as e:
+                print(f"[Models] Warm-up failed for {name}: {e}")
+                self._warmup_errors[name] = f"warm-up failed: {e}"
+                continue
+            self._stats[name]["warmup_seconds"] = round(time.perf_counter() - start, 3)
+            print(f"[Models] Warmed {name} in {self._stats[name]['warmup_seconds']:.2f}s")
+
+        self._warmed_up.set()
+        if self._warmup_errors:
+            print(f"[Models] Not ready, failed: {', '.join(self._warmup_errors)}")
+            return False
+        self._ready.set()
+        return True
+
+    def report_errors(self, errors: dict):
+        """Records warm-up failures that happened elsewhere (worker processes)."""
+        self._warmup_errors.update(errors)
+
+    def warmup_errors(self) -> dict:
+        return dict(self._warmup_errors)
+
+    @property
+    def ready(self) -> bool:
+        """Warm-up finished and every requested model loaded and warmed."""
+        return self._ready.is_set()
+
+    @property
+    def warmed_up(self) -> bool:
+        """Warm-up finished, successfully or not."""
+        return self._warmed_up.is_set()
+
+    # ===============================
+    # Introspection
+    # ===============================
+    def stats(self) -> dict:
+        """Returns load state, load time and parameter memory per model."""
+        with self._lock:
+            report = {}
+            for name in self._loaders:
+                entry = {"loaded": name in self._models}
+                entry.update(self._stats.get(name, {}))
+                if name in self._errors:
+                    entry["error"] = self._errors[name]
+                report[name] = entry
+            return report
+
+
+# ===============================
+# Helper: Parameter Memory Estimate
+# ===============================
+def _estimate_bytes(model) -> int:
+    """
+    Sums parameter and buffer sizes of any torch modules reachable from
+    the model object (directly, inside a tuple, or as attributes such as
+    EasyOCR's detector/recognizer). ONNX Runtime wrappers (a `session`
+    plus the `path` of its graph) count the size of the graph file,
+    i.e. their (possibly int8) initializers.
+    """
+    if isinstance(model, (tuple, list)):
+        return sum(_estimate_bytes(m) for m in model)
+
+    if getattr(model, "session", None) is not None and getattr(model, "path", None):
+        try:
+            return os.path.getsize(model.path)
+        except OSError:
+            return 0
+
+    try:
+        import torch
+    except ImportError:
+        return 0
+
+    modules = []
+    if isinstance(model, torch.nn.Module):
+        modules.append(model)
+    else:
+        for attr in ("detector", "recognizer", "model"):
+            candidate = getattr(model, attr, None)
+            if isinstance(candidate, torch.nn.Module):
+                modules.append(candidate)
+
+    total = 0
+    for module in modules:
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    return total
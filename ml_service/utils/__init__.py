@@ -9,15 +9,28 @@ verification service, including utility functions for:
 - Preprocessing and metadata operations
 
 Modules:
-    helpers.py  → General utilities for file handling and conversions
-    scoring.py  → Aggregates and normalizes metric scores
+    helpers.py         → General utilities for file handling and conversions
+    document.py        → Decode-once per-request document container
+    embedding_cache.py → Content-addressed template embedding cache
+    exif.py            → Header-only EXIF block locator and tag parser
+    artifact_cache.py  → Persistent content-addressed verifier artifact cache
+    execution.py       → Thread / process-pool verifier execution backends
+    batch.py           → Multipart / zip-archive inputs for batch verification
+    cpu_budget.py      → Applies torch / OpenCV thread budget and core pinning
+    scoring.py         → Aggregates and normalizes metric scores
 """
 
-from .helpers import save_temp_file, load_image_as_array
+from .helpers import save_temp_file, read_upload_bytes, load_image_as_array
 from .scoring import calculate_final_score
+from .document import DocumentContext, as_document
+from .embedding_cache import EmbeddingCache
 
 __all__ = [
     "save_temp_file",
+    "read_upload_bytes",
     "load_image_as_array",
     "calculate_final_score",
+    "DocumentContext",
+    "as_document",
+    "EmbeddingCache",
 ]
@@ -0,0 +1,226 @@
+"""
+artifact_cache.py
+------------------
+Content-addressed on-disk cache for expensive verifier intermediates.
+
+Users retry after timeouts and the backend re-verifies, so the same scan
+arrives repeatedly. Each verifier stores its expensive intermediate
+(OCR text, layout embedding, ORB keypoints, ELA statistics) under a key
+derived from the SHA-256 of the image bytes plus a verifier version
+string, and reuses it on the next request for the same bytes.
+
+Entries are pickle files; the directory is size-bounded with LRU
+eviction (file mtime is bumped on every hit) and survives restarts.
+The budget applies to the directory as a whole: every process using it
+(e.g. the ML_EXECUTION_BACKEND=process workers) updates one shared size ledger
+under an exclusive file lock, so N processes cannot grow it N-fold.
+"""
+
+import contextlib
+import fcntl
+import os
+import pickle
+import hashlib
+import threading
+import uuid
+
+# Bookkeeping files next to the entries (never evicted)
+_LOCK_FILE = ".lock"
+_SIZE_FILE = ".size"
+
+
+class ArtifactCache:
+    """
+    Size-bounded, persistent key → artifact store.
+
+    Args:
+        directory (str): Folder for cached artifacts.
+        max_bytes (int): Total size of the directory above which the least
+            recently used entries are evicted (shared by all processes).
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Re-measure on start-up: entries may have been added or removed
+            # while no process was tracking them
+            with self._directory_lock():
+                self._total = sum(size for _, size, _ in self._entries())
+                self._write_total(self._total)
+        except OSError as e:
+            print(f"[ArtifactCache] Disabled ({self.directory}): {e}")
+            self.directory = None
+
+    # ===============================
+    # Public API
+    # ===============================
+    @staticmethod
+    def make_key(content_hash: str, verifier: str, version: str) -> str:
+        return hashlib.sha256(f"{verifier}|{version}|{content_hash}".encode()).hexdigest()
+
+    def get_or_compute(self, verifier: str, content_hash: str, version: str, compute):
+        """
+        Returns the cached artifact for (verifier, content, version), or
+        calls compute(), stores its result and returns it. A None result
+        is returned but not cached.
+        """
+        if not self.directory or not content_hash:
+            return compute()
+
+        key = self.make_key(content_hash, verifier, version)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                artifact = pickle.load(f)
+            os.utime(path)  # mark as recently used
+            with self._lock:
+                self.hits += 1
+            return artifact
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[ArtifactCache] Dropping unreadable entry {key}: {e}")
+            self._remove(path)
+
+        with self._lock:
+            self.misses += 1
+        artifact = compute()
+        if artifact is not None:
+            self._store(path, artifact)
+        return artifact
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "bytes": self._read_total() if self.directory else 0,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    # ===============================
+    # Storage + LRU Eviction
+    # ===============================
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _store(self, path: str, artifact):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[ArtifactCache] Could not store {path}: {e}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock, self._directory_lock():
+            total = self._read_total() + size
+            if total > self.max_bytes:
+                total = self._evict()
+            self._write_total(total)
+            self._total = total
+
+    def _evict(self) -> int:
+        # Drop least recently used entries until 90% of the budget is free;
+        # returns the measured size left (callers hold the directory lock)
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+        return total
+
+    # ===============================
+    # Cross-process Size Ledger
+    # ===============================
+    @contextlib.contextmanager
+    def _directory_lock(self):
+        with open(os.path.join(self.directory, _LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_total(self) -> int:
+        try:
+            with open(os.path.join(self.directory, _SIZE_FILE)) as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            # Missing or torn ledger: measure the directory instead
+            return sum(size for _, size, _ in self._entries())
+
+    def _write_total(self, total: int):
+        path = os.path.join(self.directory, _SIZE_FILE)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(total))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+# ===============================
+# Shared Instance
+# ===============================
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_artifact_cache():
+    """Returns the process-wide cache configured in config.py (or None)."""
+    global _default
+    import config
+
+    if not config.ARTIFACT_CACHE_DIR:
+        return None
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = ArtifactCache(
+                    config.ARTIFACT_CACHE_DIR, config.ARTIFACT_CACHE_MAX_MB * 2**20
+                )
+    return _default
+
+
+def cached_artifact(verifier: str, document, version: str, compute):
+    """
+    Verifier-side helper: caches compute() under the document's content
+    hash when the artifact cache is enabled, otherwise just computes.
+    """
+    cache = default_artifact_cache()
+    if cache is None or document is None:
+        return compute()
+    return cache.get_or_compute(verifier, document.sha256, version, compute)
@@ -0,0 +1,194 @@
+"""
+batch.py
+---------
+Input sources for the batch verification endpoint (/verify/aadhaar/batch).
+
+A batch is a sequence of items (aadhaar number, document, optional
+template). Two upload formats are supported:
+
+    multipart → repeated `aadhaar_numbers` and `documents` fields in the
+                same order, plus zero, one (shared) or one-per-document
+                `templates`
+    archive   → a single zip `archive` containing the images and a
+                manifest.json (list of objects) or manifest.csv (header
+                row) with the keys aadhaar_number, document, template
+                (optional) and id (optional); paths are relative to the
+                archive root
+
+Documents are only read when their item is scheduled, so an archive of
+tens of thousands of scans is never held in memory at once. Templates
+are decoded once per distinct file and shared by every item using them.
+"""
+
+import csv
+import io
+import json
+import os
+import zipfile
+from collections import namedtuple
+from utils.document import DocumentContext
+
+# One unit of work; load_document() returns a DocumentContext (or None)
+BatchItem = namedtuple("BatchItem", ["index", "item_id", "aadhaar_number", "load_document", "template"])
+
+
+class BatchError(ValueError):
+    """Raised for malformed batch uploads (reported as HTTP 400)."""
+
+
+# ===============================
+# Multipart Uploads
+# ===============================
+class UploadBatch:
+    """
+    Items from parallel multipart fields whose bytes were already read.
+
+    Args:
+        numbers (list[str]): Aadhaar numbers, one per document.
+        documents (list[tuple[str, bytes]]): (filename, bytes) per document.
+        templates (list[tuple[str, bytes]]): None, one shared template or
+            one template per document.
+    """
+
+    def __init__(self, numbers, documents, templates=None):
+        numbers = list(numbers or [])
+        documents = list(documents or [])
+        templates = list(templates or [])
+
+        if not documents:
+            raise BatchError("No documents uploaded.")
+        if len(numbers) != len(documents):
+            raise BatchError(
+                f"Got {len(numbers)} aadhaar_numbers for {len(documents)} documents."
+            )
+        if len(templates) not in (0, 1, len(documents)):
+            raise BatchError("Upload no template, one shared template or one per document.")
+
+        self.numbers = numbers
+        self.documents = documents
+        self.template_sources = templates
+        self._templates = _TemplatePool()
+
+    def __len__(self):
+        return len(self.documents)
+
+    def __iter__(self):
+        for index, (number, (name, data)) in enumerate(zip(self.numbers, self.documents)):
+            template = None
+            if self.template_sources:
+                # A single uploaded template is shared by every document
+                slot = index if len(self.template_sources) > 1 else 0
+                template_name, template_data = self.template_sources[slot]
+                template = self._templates.get(f"{slot}/{template_name}", lambda d=template_data: d)
+            yield BatchItem(
+                index=index,
+                item_id=name,
+                aadhaar_number=number,
+                load_document=lambda name=name, data=data: DocumentContext.from_bytes(data, name=name),
+                template=template,
+            )
+
+    def close(self):
+        self.documents = []
+        self.template_sources = []
+        self._templates.close()
+
+
+# ===============================
+# Zip Archive Uploads
+# ===============================
+class ArchiveBatch:
+    """
+    Items described by the manifest inside a zip archive, given either as
+    its bytes (held in memory) or as a path on disk (removed by close()).
+    """
+
+    def __init__(self, source):
+        self.path = source if isinstance(source, str) else None
+        self._templates = _TemplatePool()
+        try:
+            self.archive = zipfile.ZipFile(self.path or io.BytesIO(source))
+        except zipfile.BadZipFile as e:
+            self._remove()
+            raise BatchError(f"Invalid archive: {e}")
+        try:
+            self.entries = self._read_manifest()
+        except BatchError:
+            self.close()
+            raise
+
+    def _read_manifest(self) -> list:
+        names = set(self.archive.namelist())
+        if "manifest.json" in names:
+            try:
+                entries = json.loads(self.archive.read("manifest.json"))
+            except ValueError as e:
+                raise BatchError(f"Invalid manifest.json: {e}")
+            if not isinstance(entries, list):
+                raise BatchError("manifest.json must be a list of items.")
+        elif "manifest.csv" in names:
+            text = io.TextIOWrapper(self.archive.open("manifest.csv"), encoding="utf-8-sig")
+            entries = list(csv.DictReader(text))
+        else:
+            raise BatchError("Archive has no manifest.json or manifest.csv.")
+
+        for position, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not entry.get("aadhaar_number") or not entry.get("document"):
+                raise BatchError(f"Manifest item {position} needs aadhaar_number and document.")
+            for key in ("document", "template"):
+                if entry.get(key) and entry[key] not in names:
+                    raise BatchError(f"Manifest item {position}: {entry[key]} not in archive.")
+        return entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        for index, entry in enumerate(self.entries):
+            member = entry["document"]
+            template = None
+            if entry.get("template"):
+                template = self._templates.get(entry["template"], lambda m=entry["template"]: self.archive.read(m))
+            yield BatchItem(
+                index=index,
+                item_id=str(entry.get("id") or member),
+                aadhaar_number=str(entry["aadhaar_number"]),
+                load_document=lambda member=member: DocumentContext.from_bytes(
+                    self.archive.read(member), name=os.path.basename(member)
+                ),
+                template=template,
+            )
+
+    def close(self):
+        self._templates.close()
+        self.archive.close()
+        self._remove()
+
+    def _remove(self):
+        if self.path is None:
+            return
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+# ===============================
+# Shared Template Contexts
+# ===============================
+class _TemplatePool:
+    """One DocumentContext per distinct template, shared across items."""
+
+    def __init__(self):
+        self._contexts = {}
+
+    def get(self, key: str, read):
+        if key not in self._contexts:
+            self._contexts[key] = DocumentContext.from_bytes(read(), name=os.path.basename(key))
+        return self._contexts[key]
+
+    def close(self):
+        for context in self._contexts.values():
+            if context is not None:
+                context.close()
+        self._contexts.clear()
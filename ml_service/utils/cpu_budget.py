@@ -0,0 +1,64 @@
+"""
+cpu_budget.py
+--------------
+Applies the service's CPU thread budget (config.CPU_BUDGET) to torch,
+OpenCV and the verifier pool.
+
+torch, OpenCV and the BLAS/OpenMP runtimes each default to "all cores",
+so a pool of verifier threads calling into all three oversubscribes the
+machine many times over. The budget itself is computed in config.py,
+which also exports the OpenMP/BLAS env vars before numpy or torch are
+imported; this module sets the runtime knobs, and pins worker processes
+to their own cores on request (process mode only: in thread mode all
+verifiers share one process, so pinning it gives no isolation).
+"""
+
+import os
+
+
+# ===============================
+# Apply to Libraries
+# ===============================
+def apply_cpu_budget(budget: dict) -> dict:
+    """
+    Applies the budget to torch (intra- and inter-op) and OpenCV.
+    Returns the settings actually in effect.
+    """
+    threads = budget["library_threads"]
+    applied = dict(budget)
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # can only be set before the first parallel torch op
+        applied["torch_threads"] = torch.get_num_threads()
+    except ImportError:
+        pass
+
+    try:
+        import cv2
+        cv2.setNumThreads(threads)
+        applied["opencv_threads"] = cv2.getNumThreads()
+    except ImportError:
+        pass
+
+    print(f"[CPU] Budget: {applied}")
+    return applied
+
+
+def pin_to_cores(slot: int, width: int):
+    """
+    Pins the calling worker process to its own block of `width` cores,
+    chosen round-robin by slot from the cores it is allowed to run on.
+    """
+    if not hasattr(os, "sched_setaffinity"):
+        return None
+    allowed = sorted(os.sched_getaffinity(0))
+    blocks = max(1, len(allowed) // max(1, width))
+    start = (slot % blocks) * width
+    cores = allowed[start:start + width] or allowed
+    os.sched_setaffinity(0, cores)
+    return cores
@@ -0,0 +1,444 @@
+"""
+document.py
+------------
+Per-request document container shared by every verifier.
+
+The uploaded image is read and decoded at most once per request. All
+derived views (raw bytes, BGR / RGB / grayscale arrays, PIL image, EXIF
+block) are computed lazily on first access and then handed to every
+verifier that asks for them, so the six checks no longer re-open and
+re-decode the same scan independently.
+
+Arrays returned by a DocumentContext are shared between threads and are
+marked read-only; verifiers must copy before modifying them.
+
+Verifiers that do not need full resolution ask for scaled(max_side):
+a view whose arrays come from an image pyramid built once per request
+(successive cv2.pyrDown halvings), so each check works at a bounded size
+no matter how large the upload is.
+
+A context can be backed either by a file on disk or by the in-memory
+upload itself (bytes / bytearray / memoryview). In-memory contexts never
+touch the filesystem unless a caller explicitly asks for a real path via
+spill_to_disk(); the spilled file is removed again by close().
+
+Files handed over by reference on a shared volume (from_mapped()) are
+memory-mapped read-only instead of read: the buffer is a view into the
+page cache, and the mapping is released by close().
+"""
+
+import io
+import os
+import mmap
+import uuid
+import hashlib
+import threading
+from collections import namedtuple
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+from PIL import Image
+from utils.exif import find_exif_block
+
+# Pyramid levels stop once the longest side would drop below this
+PYRAMID_MIN_SIDE = 256
+
+
+# Picklable reference to a document placed in shared memory (see share())
+SharedDocumentHandle = namedtuple(
+    "SharedDocumentHandle", ["shm_name", "name", "raw_size", "bgr_shape", "sha256"]
+)
+
+
+class DocumentContext:
+    """
+    Lazily decoded view of a single uploaded document.
+
+    Attributes are computed on first access and cached:
+        buffer    → Zero-copy memoryview over the undecoded contents
+        raw_bytes → Undecoded file contents
+        sha256    → Hex digest of the undecoded contents
+        bgr       → HxWx3 uint8 array (OpenCV channel order)
+        rgb       → HxWx3 uint8 array
+        gray      → HxW uint8 array
+        pil_image → PIL RGB image sharing the decoded pixels
+        exif      → Raw EXIF block (bytes) or None
+        pyramid   → List of BGR levels, each half the size of the previous
+    """
+
+    def __init__(self, path: str = None, name: str = None, data=None):
+        self.path = path
+        self.name = name or (os.path.basename(path) if path else "document")
+        self._data = data
+        self._spilled_path = None
+        self._shared = None      # segment this context created (owner)
+        self._attached = None    # segment this context attached to (worker)
+        self._mapped = None      # read-only mmap of a shared-volume file
+        self._cache = {}
+        self._lock = threading.RLock()
+
+    # ===============================
+    # Constructors
+    # ===============================
+    @classmethod
+    def from_path(cls, path: str):
+        """Creates a context backed by an image file on disk."""
+        if not path or not os.path.exists(path):
+            return None
+        return cls(path=path)
+
+    @classmethod
+    def from_bytes(cls, data, name: str = None):
+        """
+        Creates a context backed by an in-memory upload.
+        Accepts bytes, bytearray or memoryview; the buffer is not copied.
+        """
+        if data is None or len(data) == 0:
+            return None
+        return cls(name=name, data=data)
+
+    @classmethod
+    def from_mapped(cls, path: str, name: str = None):
+        """
+        Creates a context over a read-only memory map of a file (e.g. on
+        the media volume shared with the backend); nothing is copied.
+        """
+        if not path or not os.path.isfile(path) or os.path.getsize(path) == 0:
+            return None
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        context = cls(path=path, name=name, data=memoryview(mapped))
+        context._mapped = mapped
+        return context
+
+    @classmethod
+    def from_shared(cls, handle: SharedDocumentHandle):
+        """
+        Attaches to a document published with share() from another
+        process. Raw bytes and the BGR decode are zero-copy views into the
+        shared segment; other views are derived lazily as usual.
+        """
+        shm = shared_memory.SharedMemory(name=handle.shm_name)
+        context = cls(name=handle.name, data=shm.buf[:handle.raw_size])
+        context._attached = shm
+        if handle.sha256:
+            context._cache["sha256"] = handle.sha256
+        if handle.bgr_shape is not None:
+            bgr = np.ndarray(handle.bgr_shape, dtype=np.uint8, buffer=shm.buf, offset=handle.raw_size)
+            context._cache["bgr"] = cls._freeze(bgr)
+        return context
+
+    # ===============================
+    # Lazy Cache Helper
+    # ===============================
+    def _cached(self, key: str, loader):
+        if key in self._cache:
+            return self._cache[key]
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = loader()
+            return self._cache[key]
+
+    @staticmethod
+    def _freeze(array):
+        if array is not None:
+            array.flags.writeable = False
+        return array
+
+    # ===============================
+    # Lazily Decoded Views
+    # ===============================
+    @property
+    def buffer(self) -> memoryview:
+        if self._data is not None:
+            return memoryview(self._data)
+        return memoryview(self.raw_bytes)
+
+    @property
+    def raw_bytes(self) -> bytes:
+        def load():
+            if self._data is not None:
+                # Only bytearray / memoryview sources pay for a copy here
+                return self._data if isinstance(self._data, bytes) else bytes(self._data)
+            with open(self.path, "rb") as f:
+                return f.read()
+        return self._cached("raw_bytes", load)
+
+    @property
+    def sha256(self) -> str:
+        return self._cached("sha256", lambda: hashlib.sha256(self.buffer).hexdigest())
+
+    @property
+    def bgr(self):
+        def load():
+            buffer = np.frombuffer(self.buffer, dtype=np.uint8)
+            img = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+            if img is None:
+                # Fallback to PIL for formats OpenCV cannot decode
+                try:
+                    with Image.open(io.BytesIO(self.raw_bytes)) as pil_img:
+                        img = cv2.cvtColor(np.array(pil_img.convert("RGB")), cv2.COLOR_RGB2BGR)
+                except Exception as e:
+                    print(f"[Document] Failed to decode {self.name}: {e}")
+                    return None
+            return self._freeze(img)
+        return self._cached("bgr", load)
+
+    @property
+    def rgb(self):
+        def load():
+            if self.bgr is None:
+                return None
+            return self._freeze(cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
+        return self._cached("rgb", load)
+
+    @property
+    def gray(self):
+        def load():
+            if self.bgr is None:
+                return None
+            return self._freeze(cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY))
+        return self._cached("gray", load)
+
+    @property
+    def pil_image(self):
+        def load():
+            if self.rgb is None:
+                return None
+            return Image.fromarray(self.rgb)
+        return self._cached("pil_image", load)
+
+    def header(self, size: int = 2048) -> bytes:
+        """Returns the first `size` bytes (enough for MIME sniffing)."""
+        return bytes(self.buffer[:size])
+
+    @property
+    def exif(self):
+        def load():
+            # JPEG / PNG: walk header segments only, straight from the buffer
+            signature = self.header(8)
+            if signature[:2] == b"\xff\xd8" or signature == b"\x89PNG\r\n\x1a\n":
+                try:
+                    return find_exif_block(self.buffer)
+                except Exception:
+                    return None
+            # Other formats: Image.open only parses the header here
+            try:
+                with Image.open(io.BytesIO(self.raw_bytes)) as img:
+                    return img.info.get("exif", None)
+            except Exception:
+                return None
+        return self._cached("exif", load)
+
+    # ===============================
+    # Resolution-capped Views
+    # ===============================
+    @property
+    def pyramid(self) -> list:
+        def load():
+            if self.bgr is None:
+                return []
+            levels = [self.bgr]
+            while max(levels[-1].shape[:2]) > 2 * PYRAMID_MIN_SIDE:
+                levels.append(self._freeze(cv2.pyrDown(levels[-1])))
+            return levels
+        return self._cached("pyramid", load)
+
+    def bgr_at(self, max_side: int = None):
+        """
+        Returns the BGR image with its longest side capped at max_side.
+        Starts from the smallest pyramid level still >= max_side, so the
+        final INTER_AREA resize works on as few pixels as possible.
+        """
+        if self.bgr is None or not max_side or max(self.bgr.shape[:2]) <= max_side:
+            return self.bgr
+
+        def load():
+            source = self.bgr
+            for level in self.pyramid:
+                if max(level.shape[:2]) >= max_side:
+                    source = level
+            height, width = source.shape[:2]
+            scale = max_side / float(max(height, width))
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            return self._freeze(cv2.resize(source, size, interpolation=cv2.INTER_AREA))
+        return self._cached(f"bgr@{max_side}", load)
+
+    def scaled(self, max_side: int = None):
+        """Returns a view of this document capped at max_side pixels."""
+        return ScaledDocument(self, max_side)
+
+    # ===============================
+    # Optional Spill-to-Disk
+    # ===============================
+    def spill_to_disk(self) -> str:
+        """
+        Returns a filesystem path for consumers that cannot work from memory.
+        In-memory contexts are written out once, on first request only.
+        """
+        if self.path:
+            return self.path
+        with self._lock:
+            if self._spilled_path is None:
+                from utils.helpers import UPLOAD_DIR
+                ext = os.path.splitext(self.name)[-1].lower() or ".jpg"
+                os.makedirs(UPLOAD_DIR, exist_ok=True)
+                path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}{ext}")
+                with open(path, "wb") as f:
+                    f.write(self.buffer)
+                self._spilled_path = path
+            return self._spilled_path
+
+    # ===============================
+    # Shared Memory Hand-off
+    # ===============================
+    def share(self) -> SharedDocumentHandle:
+        """
+        Copies the raw bytes and BGR decode into one shared-memory segment
+        (once) and returns a picklable handle for from_shared(). The
+        segment is unlinked by close().
+        """
+        with self._lock:
+            if "shared_handle" in self._cache:
+                return self._cache["shared_handle"]
+
+            raw = self.buffer
+            bgr = self.bgr
+            raw_size = len(raw)
+            total = raw_size + (bgr.nbytes if bgr is not None else 0)
+
+            shm = shared_memory.SharedMemory(create=True, size=max(1, total))
+            shm.buf[:raw_size] = raw
+            if bgr is not None:
+                target = np.ndarray(bgr.shape, dtype=np.uint8, buffer=shm.buf, offset=raw_size)
+                target[:] = bgr
+                del target
+
+            self._shared = shm
+            handle = SharedDocumentHandle(
+                shm_name=shm.name,
+                name=self.name,
+                raw_size=raw_size,
+                bgr_shape=tuple(bgr.shape) if bgr is not None else None,
+                sha256=self.sha256,
+            )
+            self._cache["shared_handle"] = handle
+            return handle
+
+    def close(self):
+        """
+        Drops decoded buffers, removes any spilled temporary file, unmaps
+        a mapped file and releases shared memory (unlinking it if this
+        context created it).
+        """
+        with self._lock:
+            if self._spilled_path and os.path.exists(self._spilled_path):
+                try:
+                    os.remove(self._spilled_path)
+                except OSError as e:
+                    print(f"[Document] Could not delete spilled file {self._spilled_path}: {e}")
+            self._spilled_path = None
+            self._cache.clear()
+
+            if self._attached is not None:
+                # Views into the segment must be released before closing it
+                self._data = None
+                try:
+                    self._attached.close()
+                except BufferError:
+                    pass  # a caller still holds a view; the OS frees it on exit
+                self._attached = None
+
+            if self._mapped is not None:
+                self._data = None
+                try:
+                    self._mapped.close()
+                except BufferError:
+                    pass  # a caller still holds a view; unmapped once it is released
+                self._mapped = None
+
+            if self._shared is not None:
+                try:
+                    self._shared.close()
+                    self._shared.unlink()
+                except (BufferError, FileNotFoundError) as e:
+                    print(f"[Document] Could not release shared memory: {e}")
+                self._shared = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ScaledDocument:
+    """
+    Resolution-capped view of a DocumentContext.
+
+    Exposes the same bgr / rgb / gray / pil_image views as the parent,
+    derived lazily from the parent's pyramid and cached on the parent so
+    verifiers asking for the same cap share the arrays.
+    """
+
+    def __init__(self, parent: DocumentContext, max_side: int = None):
+        self.parent = parent
+        self.max_side = max_side if max_side and max_side > 0 else None
+
+    def _full(self) -> bool:
+        bgr = self.parent.bgr
+        return bgr is None or self.max_side is None or max(bgr.shape[:2]) <= self.max_side
+
+    @property
+    def scale(self) -> float:
+        """Working size divided by original size (1.0 when not downscaled)."""
+        if self._full():
+            return 1.0
+        return max(self.bgr.shape[:2]) / float(max(self.parent.bgr.shape[:2]))
+
+    @property
+    def bgr(self):
+        return self.parent.bgr_at(self.max_side)
+
+    @property
+    def rgb(self):
+        if self._full():
+            return self.parent.rgb
+        return self.parent._cached(
+            f"rgb@{self.max_side}",
+            lambda: DocumentContext._freeze(cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB)),
+        )
+
+    @property
+    def gray(self):
+        if self._full():
+            return self.parent.gray
+        return self.parent._cached(
+            f"gray@{self.max_side}",
+            lambda: DocumentContext._freeze(cv2.cvtColor(self.bgr, cv2.COLOR_BGR2GRAY)),
+        )
+
+    @property
+    def pil_image(self):
+        if self._full():
+            return self.parent.pil_image
+        return self.parent._cached(f"pil@{self.max_side}", lambda: Image.fromarray(self.rgb))
+
+
+# ===============================
+# Normalize Verifier Input
+# ===============================
+def as_document(source):
+    """
+    Accepts a DocumentContext, an image path or an in-memory buffer
+    (bytes / bytearray / memoryview) and returns a DocumentContext
+    (or None if the input is missing/invalid).
+    """
+    if source is None:
+        return None
+    if isinstance(source, DocumentContext):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return DocumentContext.from_bytes(source)
+    return DocumentContext.from_path(source)
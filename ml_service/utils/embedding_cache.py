@@ -0,0 +1,133 @@
+"""
+embedding_cache.py
+-------------------
+Content-addressed cache for feature vectors of reference images.
+
+Clients send the same handful of official templates over and over, so
+their embeddings are computed once and then served from:
+
+1. An in-process LRU (OrderedDict) holding the most recent vectors.
+2. An on-disk store of .npy files, opened memory-mapped, that survives
+   service restarts.
+
+Keys combine the image's SHA-256 with a version string naming the model
+and the preprocessing (e.g. working resolution), so switching feature
+extractors or preprocessing never returns stale vectors.
+"""
+
+import os
+import uuid
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Two-level (memory LRU + memory-mapped disk) embedding cache.
+
+    Args:
+        directory (str): Folder for persisted vectors (None = memory only).
+        max_entries (int): Capacity of the in-process LRU.
+    """
+
+    def __init__(self, directory: str = None, max_entries: int = 64):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.directory:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+            except OSError as e:
+                print(f"[EmbeddingCache] Disk store disabled ({self.directory}): {e}")
+                self.directory = None
+
+    # ===============================
+    # Public API
+    # ===============================
+    def get_or_compute(self, content_hash: str, version: str, compute):
+        """
+        Returns the cached vector for (content_hash, version), calling
+        compute() and storing its result on a miss. `version` must change
+        whenever the model or the preprocessing does.
+        """
+        # Version strings may contain separators ("emb-v1|resnet50|1024")
+        safe_version = "".join(c if c.isalnum() or c in "-_." else "_" for c in version)
+        key = f"{safe_version}-{content_hash}"
+
+        vector = self._get_memory(key)
+        if vector is None:
+            vector = self._get_disk(key)
+            if vector is not None:
+                self._put_memory(key, vector)
+
+        if vector is not None:
+            self.hits += 1
+            return vector
+
+        self.misses += 1
+        vector = np.ascontiguousarray(compute(), dtype=np.float32)
+        vector.flags.writeable = False
+        self._put_memory(key, vector)
+        self._put_disk(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._memory),
+            "hits": self.hits,
+            "misses": self.misses,
+            "directory": self.directory,
+        }
+
+    # ===============================
+    # In-process LRU
+    # ===============================
+    def _get_memory(self, key: str):
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+            return vector
+
+    def _put_memory(self, key: str, vector):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # ===============================
+    # Memory-mapped Disk Store
+    # ===============================
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def _get_disk(self, key: str):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            return np.load(path, mmap_mode="r")
+        except Exception as e:
+            print(f"[EmbeddingCache] Ignoring unreadable entry {path}: {e}")
+            return None
+
+    def _put_disk(self, key: str, vector):
+        if not self.directory:
+            return
+        # Write to a temp name then rename, so readers never see partial files
+        tmp_path = os.path.join(self.directory, f".{uuid.uuid4().hex}.tmp.npy")
+        try:
+            np.save(tmp_path, vector)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            print(f"[EmbeddingCache] Could not persist {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
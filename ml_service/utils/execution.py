@@ -0,0 +1,137 @@
+"""
+execution.py
+-------------
+Execution backends for running verifiers.
+
+"thread"  → every verifier runs on a shared ThreadPoolExecutor (default).
+"process" → CPU-heavy verifiers run on a pre-warmed pool of worker
+            processes, each holding its own loaded models, so pure-Python
+            work no longer serializes on the GIL. Documents are handed
+            over through shared memory (DocumentContext.share()), not
+            pickled; cheap verifiers stay on the thread pool.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from utils.document import DocumentContext, SharedDocumentHandle
+from utils.cpu_budget import apply_cpu_budget, pin_to_cores
+
+
+# ===============================
+# Worker-process Side
+# ===============================
+def _init_worker(preload_models, library_threads, pin_cores, slot_counter):
+    """
+    Runs once in each worker: applies its share of the CPU budget,
+    optionally pins itself to its own cores, and warms its models.
+    """
+    if pin_cores:
+        with slot_counter.get_lock():
+            slot = slot_counter.value
+            slot_counter.value += 1
+        pin_to_cores(slot, library_threads)
+
+    apply_cpu_budget({
+        "total_cores": library_threads,
+        "verifier_workers": 1,
+        "library_threads": library_threads,
+    })
+
+    from models import registry
+    registry.warm_up(preload_models)
+    print(f"[Worker {os.getpid()}] Ready ({', '.join(preload_models) or 'no models'})")
+
+
+def _warmup_errors():
+    """This worker's model warm-up failures (empty once it is healthy)."""
+    from models import registry
+    return registry.warmup_errors()
+
+
+def _run_shared(fn, args):
+    """Rebuilds shared documents in the worker, runs fn, then detaches."""
+    contexts = []
+    resolved = []
+    for arg in args:
+        if isinstance(arg, SharedDocumentHandle):
+            context = DocumentContext.from_shared(arg)
+            contexts.append(context)
+            resolved.append(context)
+        else:
+            resolved.append(arg)
+    try:
+        return fn(*resolved)
+    finally:
+        for context in contexts:
+            context.close()
+
+
+# ===============================
+# Dispatcher
+# ===============================
+class VerifierExecutor:
+    """
+    Dispatches verifier calls to the configured backend.
+
+    Args:
+        backend (str): "thread" or "process".
+        thread_workers (int): Size of the thread pool (always created).
+        process_workers (int): Number of worker processes ("process" only).
+        process_verifiers (list[str]): Verifier names sent to processes.
+        preload_models (list[str]): Models each worker loads at start-up.
+        library_threads (int): torch/OpenCV threads per worker process.
+        pin_cores (bool): Pin each worker process to its own cores.
+    """
+
+    def __init__(self, backend: str = "thread", thread_workers: int = 6,
+                 process_workers: int = None, process_verifiers=None,
+                 preload_models=None, library_threads: int = 1,
+                 pin_cores: bool = False):
+        self.backend = backend
+        self.threads = ThreadPoolExecutor(max_workers=thread_workers)
+        self.process_verifiers = set(process_verifiers or [])
+        self.processes = None
+
+        if backend == "process":
+            process_workers = process_workers or os.cpu_count() or 1
+            # spawn, not fork: forking a process with torch/OpenMP threads is unsafe
+            context = multiprocessing.get_context("spawn")
+            self.processes = ProcessPoolExecutor(
+                max_workers=process_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(list(preload_models or []), library_threads, pin_cores, context.Value("i", 0)),
+            )
+            self.process_workers = process_workers
+
+    def submit(self, name: str, fn, *args):
+        """Runs fn(*args) on the backend configured for verifier `name`."""
+        if self.processes is not None and name in self.process_verifiers:
+            shared_args = tuple(
+                arg.share() if isinstance(arg, DocumentContext) else arg for arg in args
+            )
+            return self.processes.submit(_run_shared, fn, shared_args)
+        return self.threads.submit(fn, *args)
+
+    def warm_up(self) -> dict:
+        """
+        Starts every worker process (running its model warm-up), waits,
+        and returns the model warm-up failures reported by the workers.
+        """
+        if self.processes is None:
+            return {}
+        futures = [self.processes.submit(_warmup_errors) for _ in range(self.process_workers)]
+        wait(futures)
+        errors = {}
+        for future in futures:
+            try:
+                errors.update(future.result())
+            except Exception as e:
+                errors["worker"] = f"worker start failed: {e}"
+        return errors
+
+    def shutdown(self):
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        if self.processes is not None:
+            self.processes.shutdown(wait=False, cancel_futures=True)
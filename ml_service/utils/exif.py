@@ -0,0 +1,162 @@
+"""
+exif.py
+--------
+Minimal, header-only EXIF reader.
+
+Locates the EXIF block by walking JPEG marker segments (or PNG chunks)
+up to the start of the image data, and parses only the TIFF tags a
+caller asks for, plus a count of the tags present. Pixel data is never
+touched and no tag-name tables are consulted.
+"""
+
+import struct
+
+# IFD pointer tags
+_EXIF_IFD_POINTER = 0x8769
+_GPS_IFD_POINTER = 0x8825
+_INTEROP_IFD_POINTER = 0xA005
+
+# TIFF field type → size in bytes
+_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8}
+
+_EXIF_HEADER = b"Exif\x00\x00"
+
+
+# ===============================
+# Locate the EXIF Block
+# ===============================
+def find_exif_block(buffer):
+    """
+    Returns the raw EXIF block (TIFF structure, without the "Exif\\0\\0"
+    prefix) from JPEG or PNG bytes, or None. Stops at the first image
+    data segment, so only the file header is read.
+    """
+    data = memoryview(buffer)
+    if len(data) >= 4 and data[0] == 0xFF and data[1] == 0xD8:
+        return _find_jpeg_exif(data)
+    if bytes(data[:8]) == b"\x89PNG\r\n\x1a\n":
+        return _find_png_exif(data)
+    return None
+
+
+def _find_jpeg_exif(data):
+    pos = 2
+    size = len(data)
+    while pos + 4 <= size:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if marker in (0xD9, 0xDA):  # EOI / start of scan: header is over
+            return None
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:  # markers without length
+            pos += 2
+            continue
+        length = (data[pos + 2] << 8) | data[pos + 3]
+        segment = data[pos + 4:pos + 2 + length]
+        if marker == 0xE1 and bytes(segment[:6]) == _EXIF_HEADER:
+            return bytes(segment[6:])
+        pos += 2 + length
+    return None
+
+
+def _find_png_exif(data):
+    pos = 8
+    size = len(data)
+    while pos + 8 <= size:
+        length = struct.unpack(">I", data[pos:pos + 4])[0]
+        chunk_type = bytes(data[pos + 4:pos + 8])
+        if chunk_type == b"eXIf":
+            block = bytes(data[pos + 8:pos + 8 + length])
+            return block[6:] if block.startswith(_EXIF_HEADER) else block
+        if chunk_type in (b"IDAT", b"IEND"):
+            return None
+        pos += 12 + length
+    return None
+
+
+# ===============================
+# Parse Selected Tags
+# ===============================
+def parse_exif_tags(block: bytes, wanted: dict) -> tuple:
+    """
+    Walks the IFDs of a TIFF/EXIF block.
+
+    Args:
+        block (bytes): EXIF block (with or without the "Exif\\0\\0" prefix).
+        wanted (dict): {tag_id: name} for the tags whose values are needed.
+
+    Returns:
+        tuple: (values, tag_count) where values maps name → decoded value
+            for the wanted tags found, and tag_count is the number of
+            distinct tags present across IFD0/IFD1/Exif/GPS/Interop.
+    """
+    if block.startswith(_EXIF_HEADER):
+        block = block[6:]
+    if len(block) < 8 or block[:2] not in (b"II", b"MM"):
+        return {}, 0
+
+    endian = "<" if block[:2] == b"II" else ">"
+    ifd0 = struct.unpack(endian + "I", block[4:8])[0]
+
+    values = {}
+    seen_tags = set()
+    visited = set()
+    pending = [(ifd0, "main", True)]
+
+    while pending:
+        offset, namespace, follow_next = pending.pop()
+        if offset in visited or offset + 2 > len(block):
+            continue
+        visited.add(offset)
+
+        count = struct.unpack(endian + "H", block[offset:offset + 2])[0]
+        for i in range(count):
+            entry = offset + 2 + 12 * i
+            if entry + 12 > len(block):
+                break
+            tag, field_type, n = struct.unpack(endian + "HHI", block[entry:entry + 8])
+            seen_tags.add((namespace, tag))
+
+            if tag == _EXIF_IFD_POINTER:
+                pending.append((_read_long(block, endian, entry), "main", False))
+            elif tag == _GPS_IFD_POINTER:
+                pending.append((_read_long(block, endian, entry), "gps", False))
+            elif tag == _INTEROP_IFD_POINTER:
+                pending.append((_read_long(block, endian, entry), "interop", False))
+            elif namespace == "main" and tag in wanted:
+                values[wanted[tag]] = _read_value(block, endian, entry, field_type, n)
+
+        # IFD0 links to IFD1 (thumbnail) through its "next IFD" offset
+        next_pos = offset + 2 + 12 * count
+        if follow_next and next_pos + 4 <= len(block):
+            next_ifd = struct.unpack(endian + "I", block[next_pos:next_pos + 4])[0]
+            if next_ifd:
+                pending.append((next_ifd, "main", False))
+
+    # Pointer tags are bookkeeping, not metadata
+    seen_tags -= {("main", _EXIF_IFD_POINTER), ("main", _GPS_IFD_POINTER), ("main", _INTEROP_IFD_POINTER)}
+    return values, len(seen_tags)
+
+
+def _read_long(block: bytes, endian: str, entry: int) -> int:
+    return struct.unpack(endian + "I", block[entry + 8:entry + 12])[0]
+
+
+def _read_value(block: bytes, endian: str, entry: int, field_type: int, n: int):
+    size = _TYPE_SIZES.get(field_type, 1) * n
+    if size <= 4:
+        raw = block[entry + 8:entry + 8 + size]
+    else:
+        start = _read_long(block, endian, entry)
+        raw = block[start:start + size]
+
+    if field_type == 2:  # ASCII
+        return raw.split(b"\x00", 1)[0].decode(errors="ignore")
+    if field_type == 3 and n == 1:
+        return struct.unpack(endian + "H", raw[:2])[0]
+    if field_type == 4 and n == 1:
+        return struct.unpack(endian + "I", raw[:4])[0]
+    return raw
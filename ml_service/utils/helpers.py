@@ -1,5 +1,6 @@
 import os
 import uuid
+import shutil
 import cv2
 import numpy as np
 from PIL import Image
@@ -33,7 +34,7 @@ def save_temp_file(uploaded_file: UploadFile) -> str:
     try:
         uploaded_file.file.seek(0)
         with open(temp_path, "wb") as buffer:
-            buffer.write(uploaded_file.file.read())
+            shutil.copyfileobj(uploaded_file.file, buffer)  # streamed, not read into memory
         print(f"[FileSaved] {uploaded_file.filename} -> {temp_path}")
     except Exception as e:
         print(f"[Error] Failed to save file: {e}")
@@ -42,6 +43,46 @@ def save_temp_file(uploaded_file: UploadFile) -> str:
     return temp_path
 
 
+# ===============================
+# Read Uploaded File into Memory
+# ===============================
+async def read_upload_bytes(uploaded_file: UploadFile) -> bytes:
+    """
+    Reads an uploaded FastAPI UploadFile fully into memory.
+    Returns the raw bytes (or None if no file was uploaded).
+
+    Uploads up to config.UPLOAD_SPOOL_MAX_MB never touch the disk (see
+    the MultiPartParser setting in app.py); larger ones were already
+    spooled to a temporary file by the multipart parser.
+    """
+    if uploaded_file is None:
+        return None
+
+    await uploaded_file.seek(0)
+    return await uploaded_file.read()
+
+
+# ===============================
+# Resolve Shared-volume References
+# ===============================
+def resolve_shared_path(reference: str, root: str) -> str:
+    """
+    Maps a storage reference sent by the backend (a path relative to the
+    media volume both containers mount) to an absolute path under `root`.
+    Raises ValueError for references that escape the root or do not exist.
+    """
+    if not root:
+        raise ValueError("Shared media volume is not configured (ML_SHARED_MEDIA_ROOT).")
+
+    root = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(root, reference.lstrip("/")))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Reference outside the shared media volume: {reference}")
+    if not os.path.isfile(path):
+        raise ValueError(f"Referenced file not found: {reference}")
+    return path
+
+
 # ===============================
 # Load Image as NumPy Array
 # ===============================
@@ -0,0 +1,177 @@
+"""
+scheduler.py
+-------------
+Cost-aware verifier scheduling with early termination.
+
+Every verifier has a typical cost (seeded below, then tracked as a moving
+average of measured run times) and a weight in the final score. Checks
+run in two tiers:
+
+    cheap     → checks whose typical cost is at most config.SCHEDULER_CHEAP_MS
+                (verhoeff, metadata, usually ELA) start first, in parallel
+    expensive → the rest start, cheapest first, once the cheap tier is done
+
+After every completed check the scheduler computes the lowest and highest
+final score still reachable (missing checks may score anywhere in 0–1).
+Once both fall into the same classification the result can no longer
+change: expensive checks are not started, queued ones are cancelled, and
+running ones are abandoned (their results are ignored). The names of
+those checks are reported as skipped, with a score of None.
+"""
+
+import asyncio
+import threading
+import time
+from utils.scoring import WEIGHTS, THRESHOLDS, is_decided
+
+# Seed costs (ms per document on one core) until real timings exist
+DEFAULT_COSTS_MS = {
+    "verhoeff": 0.05,
+    "metadata": 2.0,
+    "ela": 60.0,
+    "layout": 150.0,
+    "copy_move": 300.0,
+    "text": 1500.0,
+}
+
+# Weight of the newest measurement in the moving average
+COST_SMOOTHING = 0.2
+
+
+def timed_call(fn, *args):
+    """Runs fn(*args) and returns (result, seconds); runs inside the worker."""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class VerifierScheduler:
+    """
+    Runs a set of verifier calls on a VerifierExecutor, cheapest first,
+    stopping as soon as the classification is decided.
+
+    Args:
+        executor (VerifierExecutor): Backend the checks are submitted to.
+        cheap_ms (float): Typical cost up to which a check is "cheap".
+    """
+
+    def __init__(self, executor, cheap_ms: float = 100.0):
+        self.executor = executor
+        self.cheap_ms = cheap_ms
+        self._costs = dict(DEFAULT_COSTS_MS)
+        self._lock = threading.Lock()
+        self.skipped_total = {}
+
+    # ===============================
+    # Cost Model
+    # ===============================
+    def cost(self, name: str) -> float:
+        with self._lock:
+            return self._costs.get(name, float("inf"))
+
+    def record(self, name: str, seconds: float):
+        ms = 1000.0 * seconds
+        with self._lock:
+            previous = self._costs.get(name)
+            self._costs[name] = ms if previous is None else (
+                (1.0 - COST_SMOOTHING) * previous + COST_SMOOTHING * ms
+            )
+
+    def tiers(self, names) -> list:
+        """Splits check names into [cheap, expensive], each cheapest first."""
+        ordered = sorted(names, key=self.cost)
+        cheap = [name for name in ordered if self.cost(name) <= self.cheap_ms]
+        return [cheap, [name for name in ordered if name not in cheap]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            costs = {name: round(ms, 2) for name, ms in self._costs.items()}
+        return {"cheap_ms": self.cheap_ms, "typical_ms": costs, "skipped": dict(self.skipped_total)}
+
+    # ===============================
+    # Scheduling
+    # ===============================
+    async def run(self, calls: dict, timeout: float, early_exit: bool = True,
+                  weights=WEIGHTS, thresholds=THRESHOLDS, on_result=None) -> tuple:
+        """
+        Runs calls ({name: (fn, args)}) and returns (results, skipped,
+        details). Results keep the order of `calls`; failed or timed-out
+        checks score 0.0 and skipped checks None. A check may return
+        (score, detail) instead of a score; its detail is collected in
+        details[name].
+
+        on_result(name, score, status, seconds), if given, is called on
+        the event loop as soon as each check is settled; status is "ok",
+        "failed", "timeout" or "skipped".
+        """
+        deadline = time.monotonic() + timeout
+        started = {}
+        results = {}
+        details = {}
+        decided = timed_out = False
+
+        def report(name, score, status, seconds=None):
+            if seconds is None and name in started:
+                seconds = time.perf_counter() - started[name]
+            if on_result is not None:
+                on_result(name, score, status, seconds)
+
+        for tier in (self.tiers(calls) if early_exit else [list(calls)]):
+            if decided or timed_out:
+                break
+            waiting = {}
+            for name in tier:
+                fn, args = calls[name]
+                started[name] = time.perf_counter()
+                future = self.executor.submit(name, timed_call, fn, *args)
+                waiting[asyncio.wrap_future(future)] = (name, future)
+
+            while waiting and not decided:
+                remaining = deadline - time.monotonic()
+                done, _ = await asyncio.wait(
+                    waiting.keys(), timeout=max(0.0, remaining),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    timed_out = True
+                    break
+
+                for wrapped in done:
+                    name, _ = waiting.pop(wrapped)
+                    try:
+                        score, seconds = wrapped.result()
+                        if isinstance(score, tuple):
+                            score, details[name] = score
+                        self.record(name, seconds)
+                        results[name] = round(score, 3)
+                        report(name, results[name], "ok", seconds)
+                    except Exception as e:
+                        results[name] = 0.0  # Default to 0 if a module fails
+                        print(f"[Warning] {name} check failed: {e}")
+                        report(name, 0.0, "failed")
+
+                decided = early_exit and is_decided(results, weights, thresholds)
+
+            # Queued checks are dropped; running ones finish in the background
+            # and their results are ignored
+            for name, future in waiting.values():
+                future.cancel()
+
+        if timed_out:
+            for name in calls:
+                if name not in results:
+                    results[name] = 0.0
+                    print(f"[Warning] {name} check timed out after {timeout}s")
+                    report(name, 0.0, "timeout")
+
+        skipped = [name for name in calls if name not in results]
+        if skipped:
+            with self._lock:
+                for name in skipped:
+                    self.skipped_total[name] = self.skipped_total.get(name, 0) + 1
+            print(f"[Scheduler] Classification decided early, skipped: {', '.join(skipped)}")
+            for name in skipped:
+                report(name, None, "skipped")
+
+        # Keep the response keys in submission order
+        return {name: results.get(name) for name in calls}, skipped, details
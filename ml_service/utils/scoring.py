@@ -13,6 +13,43 @@ Returns:
 
 import numpy as np
 
+# Weights for each metric (sum = 1.0)
+WEIGHTS = {
+    "verhoeff": 0.20,
+    "layout": 0.10,
+    "text": 0.20,
+    "copy_move": 0.20,
+    "metadata": 0.15,
+    "ela": 0.15
+}
+
+# (classification, minimum final score), best first; below all → "Forged"
+THRESHOLDS = [("Authentic", 0.7), ("Suspicious", 0.4)]
+
+
+def classify(final_score: float, thresholds=THRESHOLDS) -> str:
+    """Maps a final score to its classification label."""
+    for label, minimum in thresholds:
+        if final_score >= minimum:
+            return label
+    return "Forged"
+
+
+def score_bounds(scores: dict, weights=WEIGHTS) -> tuple:
+    """
+    Lowest and highest final score still reachable when only some metrics
+    are known (missing ones may still score anywhere in 0.0–1.0).
+    """
+    known = sum(weights[key] * scores[key] for key in weights if scores.get(key) is not None)
+    unknown = sum(weights[key] for key in weights if scores.get(key) is None)
+    return max(0.0, min(1.0, known)), max(0.0, min(1.0, known + unknown))
+
+
+def is_decided(scores: dict, weights=WEIGHTS, thresholds=THRESHOLDS) -> bool:
+    """True once the missing metrics can no longer change the classification."""
+    low, high = score_bounds(scores, weights)
+    return classify(low, thresholds) == classify(high, thresholds)
+
 
 def calculate_final_score(scores: dict) -> dict:
     """
@@ -47,21 +84,11 @@ def calculate_final_score(scores: dict) -> dict:
     }
 
     # Merge provided and default values
-    data = {**defaults, **scores}
-
-    # Define weights for each metric (sum = 1.0)
-    weights = {
-        "verhoeff": 0.20,
-        "layout": 0.10,
-        "text": 0.20,
-        "copy_move": 0.20,
-        "metadata": 0.15,
-        "ela": 0.15
-    }
+    data = {**defaults, **{key: value for key, value in scores.items() if value is not None}}
 
     # Step 1: Compute weighted score
     weighted_values = [
-        data[key] * weights[key] for key in weights.keys()
+        data[key] * WEIGHTS[key] for key in WEIGHTS.keys()
     ]
     final_score = float(np.sum(weighted_values))
 
@@ -69,12 +96,7 @@ def calculate_final_score(scores: dict) -> dict:
     final_score = max(0.0, min(1.0, final_score))
 
     # Step 3: Classification logic
-    if final_score >= 0.7:
-        classification = "Authentic"
-    elif final_score >= 0.4:
-        classification = "Suspicious"
-    else:
-        classification = "Forged"
+    classification = classify(final_score)
 
     print(f"[Scoring] Scores={data} → Final={final_score:.3f} ({classification})")
 
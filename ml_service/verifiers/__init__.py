@@ -7,7 +7,7 @@ forgery or authenticity analysis on uploaded documents.
 
 Modules:
     verhoeff.py       → Aadhaar checksum verification
-    layout_check.py   → Layout similarity via ResNet-50
+    layout_check.py   → Layout similarity via a pluggable CNN backbone
     text_check.py     → OCR and semantic text similarity
     copy_move.py      → Copy-move forgery detection
     metadata_check.py → Metadata and EXIF integrity analysis
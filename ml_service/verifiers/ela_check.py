@@ -5,64 +5,171 @@ Performs Error Level Analysis (ELA) to detect digital tampering or splicing
 in uploaded document images.
 
 Algorithm Summary:
-1. Recompresses image at known quality (90%).
+1. Recompresses image in memory at known quality (90% by default).
 2. Computes pixel-wise difference between original and recompressed images.
-3. Amplifies and analyzes error distribution.
+3. Analyzes the normalized error distribution.
 4. Returns authenticity score (0.0–1.0) based on error variance.
 
+On request (details=True) the same pass also evaluates every quality in
+config.ELA_QUALITIES and reports per-tile error statistics with the
+worst tiles, i.e. where in the image the compression error stands out.
+The score itself always comes from the first quality.
+
 Returns:
     float: Authenticity score between 0.0 (forged) and 1.0 (authentic).
 """
 
-import os
-import io
+import cv2
 import numpy as np
-from PIL import Image, ImageChops, ImageEnhance
+from utils.document import as_document
+from utils.artifact_cache import cached_artifact
+import config
+
+
+# ===============================
+# ELA Statistics (array-native)
+# ===============================
+def _block_statistics(error, scale: float, block_size: int, top_blocks: int) -> dict:
+    """Per-tile mean error (normalized like the global stats) and the worst tiles."""
+    rows, cols = error.shape[0] // block_size, error.shape[1] // block_size
+    tiles = error[:rows * block_size, :cols * block_size].reshape(rows, block_size, cols, block_size)
+    block_means = tiles.mean(axis=(1, 3), dtype=np.float32) * scale
+    median = float(np.median(block_means))
+    mad = float(np.median(np.abs(block_means - median))) or 1e-6
+
+    flat = block_means.ravel()
+    top = min(top_blocks, flat.size)
+    worst = np.argpartition(flat, -top)[-top:] if top else []
+    worst = sorted(worst, key=lambda index: -flat[index])
+    return {
+        "size": block_size,
+        "grid": [rows, cols],
+        "median_mean": median,
+        "max_robust_z": (float(flat.max()) - median) / mad,
+        "worst": [
+            {
+                # Tile origin in pixels of the analyzed view (see "shape")
+                "x": int(index % cols) * block_size,
+                "y": int(index // cols) * block_size,
+                "mean": float(flat[index]),
+                "robust_z": (float(flat[index]) - median) / mad,
+            }
+            for index in worst
+        ],
+    }
+
+
+def ela_statistics(image_path, qualities=None, block_size: int = 0,
+                   top_blocks: int = None, max_side: int = None) -> dict:
+    """
+    Recompresses the image in memory at each JPEG quality and computes
+    error statistics directly on arrays (no intermediate PIL images).
 
+    Args:
+        image_path (str | DocumentContext): Image path or shared document.
+        qualities (list[int]): JPEG qualities (default: the first of
+            config.ELA_QUALITIES only, i.e. the score path).
+        block_size (int): Tile size for block-level statistics (0 = off).
+        top_blocks (int): Worst tiles to report (default config).
+        max_side (int): Working resolution cap (default config, 0 = full).
 
-def ela_analysis(image_path: str) -> float:
+    Returns:
+        dict: {"shape": [h, w], "qualities": {quality: {"mean", "std",
+            "max_diff", "blocks"?}}}; mean/std on the 0–255 normalized
+            error scale. Empty if the image cannot be read.
+    """
+    document = as_document(image_path)
+    if document is None:
+        return {}
+
+    qualities = qualities or config.ELA_QUALITIES[:1]
+    top_blocks = config.ELA_TOP_BLOCKS if top_blocks is None else top_blocks
+    max_side = config.ELA_MAX_SIDE if max_side is None else max_side
+
+    original = document.scaled(max_side).bgr
+    if original is None:
+        return {}
+
+    stats = {}
+    for quality in qualities:
+        # Step 1: Recompress in memory through libjpeg
+        ok, encoded = cv2.imencode(".jpg", original, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        if not ok:
+            continue
+        recompressed = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+        # Step 2: Per-pixel error, reduced to luma
+        diff = cv2.absdiff(original, recompressed)
+        max_diff = int(diff.max())
+        error = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
+
+        # Step 3: Statistics on the error normalized so its max channel
+        # difference maps to 255 (what the brightness-enhanced image showed)
+        scale = 255.0 / max_diff if max_diff != 0 else 1.0
+        mean, std = cv2.meanStdDev(error)
+        entry = {
+            "mean": float(mean[0][0]) * scale,
+            "std": float(std[0][0]) * scale,
+            "max_diff": max_diff,
+        }
+
+        # Step 3b: Tile statistics from the same error array
+        if block_size and min(error.shape) >= block_size:
+            entry["blocks"] = _block_statistics(error, scale, block_size, top_blocks)
+
+        stats[str(int(quality))] = entry
+
+    if not stats:
+        return {}
+    return {"shape": [int(original.shape[0]), int(original.shape[1])], "qualities": stats}
+
+
+def ela_analysis(image_path, max_side: int = None, details: bool = False):
     """
     Performs ELA-based tampering detection.
 
     Args:
-        image_path (str): Path to input image file.
+        image_path (str | DocumentContext): Path to input image file or the
+            shared per-request document.
+        max_side (int): Working resolution cap; the preliminary tier runs
+            on a downscaled view (default config.ELA_MAX_SIDE).
+        details (bool): Also evaluate every configured quality with tile
+            statistics and return them (see ela_statistics()).
 
     Returns:
-        float: Authenticity score between 0.0 and 1.0.
+        float: Authenticity score between 0.0 and 1.0, or
+        tuple: (score, statistics) when details is True.
     """
 
-    if not image_path or not os.path.exists(image_path):
+    document = as_document(image_path)
+    if document is None:
         print("[ELA] Invalid image path.")
-        return 0.0
+        return (0.0, {}) if details else 0.0
 
     try:
-        # Step 1: Open image and ensure it's in RGB
-        original = Image.open(image_path).convert("RGB")
-
-        # Step 2: Recompress image at 90% quality
-        buffer = io.BytesIO()
-        original.save(buffer, "JPEG", quality=90)
-        buffer.seek(0)
-        recompressed = Image.open(buffer)
-
-        # Step 3: Compute ELA image (difference)
-        ela_image = ImageChops.difference(original, recompressed)
-
-        # Step 4: Amplify the ELA differences for visibility
-        extrema = ela_image.getextrema()
-        max_diff = max([ex[1] for ex in extrema])
-        scale = 255.0 / max_diff if max_diff != 0 else 1
-        ela_image = ImageEnhance.Brightness(ela_image).enhance(scale)
-
-        # Step 5: Convert ELA image to grayscale for numeric analysis
-        ela_gray = ela_image.convert("L")
-        ela_array = np.asarray(ela_gray, dtype=np.float32)
-
-        # Step 6: Compute pixel statistics
-        mean_intensity = np.mean(ela_array)
-        std_intensity = np.std(ela_array)
-
-        # Step 7: Heuristic-based authenticity scoring
+        # Step 1-3: Recompress and measure error directly on arrays
+        # (reused from the artifact cache when this scan was seen before)
+        max_side = config.ELA_MAX_SIDE if max_side is None else max_side
+        if details:
+            qualities, block_size = config.ELA_QUALITIES, config.ELA_BLOCK_SIZE
+            version = f"ela-v3|{qualities}|{block_size}|{config.ELA_TOP_BLOCKS}|{max_side}"
+        else:
+            qualities, block_size = config.ELA_QUALITIES[:1], 0
+            version = f"ela-v3|{qualities}|{max_side}"
+        stats = cached_artifact(
+            "ela", document, version,
+            lambda: ela_statistics(document, qualities, block_size, max_side=max_side) or None,
+        )
+        if not stats:
+            print("[ELA] Failed to load image.")
+            return (0.0, {}) if details else 0.0
+
+        # The first configured quality (90 by default) drives the score
+        primary = stats["qualities"][str(int(config.ELA_QUALITIES[0]))]
+        mean_intensity = primary["mean"]
+        std_intensity = primary["std"]
+
+        # Step 4: Heuristic-based authenticity scoring
         # Higher mean/std → more compression inconsistency → likely tampering
         # Typical authentic JPEGs have mean < 20 and std < 10
         mean_norm = min(mean_intensity / 50.0, 1.0)
@@ -78,8 +185,9 @@ def ela_analysis(image_path: str) -> float:
         print(f"[ELA] mean={mean_intensity:.2f}, std={std_intensity:.2f}, "
               f"tamper_index={tamper_index:.2f}, score={authenticity_score:.3f}")
 
-        return round(authenticity_score, 3)
+        score = round(authenticity_score, 3)
+        return (score, stats) if details else score
 
     except Exception as e:
         print(f"[ELA Error] {e}")
-        return 0.0
+        return (0.0, {}) if details else 0.0
@@ -1,43 +1,18 @@
-import os
-import cv2
+import time
 import torch
 import numpy as np
-from torchvision import models, transforms
-from torchvision.models import ResNet50_Weights
+from torchvision import transforms
 from sklearn.metrics.pairwise import cosine_similarity
-import easyocr
-from sentence_transformers import SentenceTransformer
 import warnings
+from models import get_model, get_device, MicroBatcher
+from models.backbones import record_cost
+from utils.document import as_document
+from utils.embedding_cache import EmbeddingCache
+from utils.artifact_cache import cached_artifact
+import config
 
 warnings.filterwarnings("ignore", category=UserWarning)
 
-# ===============================
-# Global device definition
-# ===============================
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-# ===============================
-# Initialize OCR and Text Models
-# ===============================
-try:
-    ocr_reader = easyocr.Reader(['en'], gpu=False)
-    sbert_model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
-    print("[Init] EasyOCR and Sentence-BERT initialized successfully.")
-except Exception as e:
-    print(f"[Init Warning] Could not initialize OCR/Text models: {e}")
-
-# ===============================
-# Initialize ResNet50 (Pretrained on ImageNet)
-# ===============================
-try:
-    resnet = models.resnet50(weights=ResNet50_Weights.IMAGENET1K_V1)
-    resnet.eval()
-    resnet.to(device)
-    print(f"[Init] ResNet50 model loaded on {device}.")
-except Exception as e:
-    print(f"[Init Error] Failed to load ResNet50: {e}")
-    resnet = None  # fail-safe
-
 # ===============================
 # Preprocessing Function
 # ===============================
@@ -50,40 +25,95 @@ preprocess = transforms.Compose([
                          std=[0.229, 0.224, 0.225])
 ])
 
+# ===============================
+# Template Embedding Cache
+# ===============================
+# Official templates repeat across requests: their features are cached by
+# content hash so only the uploaded document goes through the network
+template_cache = EmbeddingCache(
+    directory=config.TEMPLATE_CACHE_DIR or None,
+    max_entries=config.TEMPLATE_CACHE_SIZE,
+)
+
+# ===============================
+# Micro-batched Backbone Inference
+# ===============================
+# Headless backbone (config.LAYOUT_BACKBONE) on ONNX Runtime (int8) or
+# eager PyTorch, per config.INFERENCE_BACKEND
+LAYOUT_MODEL = config.LAYOUT_MODEL
+
+
+def _run_backbone_batch(tensors: list):
+    """Runs one forward pass over preprocessed 3x224x224 tensors."""
+    backbone = get_model(LAYOUT_MODEL)
+    batch = torch.stack(tensors)
+    start = time.perf_counter()
+    if LAYOUT_MODEL.endswith("_onnx"):
+        features = np.asarray(backbone(batch.numpy()))
+    else:
+        with torch.no_grad():
+            features = backbone(batch.to(get_device())).cpu().numpy()
+    record_cost(config.LAYOUT_BACKBONE, len(tensors), time.perf_counter() - start)
+    return list(features)
+
+
+layout_batcher = MicroBatcher(
+    "layout",
+    _run_backbone_batch,
+    max_batch_size=config.LAYOUT_BATCH_SIZE,
+    max_wait_ms=config.LAYOUT_BATCH_WAIT_MS,
+)
+
 # ===============================
 # Layout Similarity Function
 # ===============================
-def layout_similarity(doc_path: str, template_path: str) -> float:
-    if not resnet:
+def layout_similarity(doc_path, template_path) -> float:
+    # Borrow the shared layout backbone from the model registry
+    backbone = get_model(LAYOUT_MODEL)
+    if backbone is None:
         print("[LayoutCheck] Model not initialized.")
         return 0.0
 
-    if not doc_path or not os.path.exists(doc_path):
+    document = as_document(doc_path)
+    if document is None:
         print("[LayoutCheck] Invalid or missing document path.")
         return 0.0
 
-    if not template_path or not os.path.exists(template_path):
+    template = as_document(template_path)
+    if template is None:
         print("[LayoutCheck] Template missing, fallback neutral score 0.5.")
         return 0.5
 
     try:
-        doc_img = cv2.imread(doc_path)
-        tmpl_img = cv2.imread(template_path)
+        def extract(img):
+            # Queued with concurrent requests and run as one batched forward
+            return layout_batcher.infer(preprocess(img))[None, :]
 
-        if doc_img is None or tmpl_img is None:
-            print("[LayoutCheck] Failed to load document or template image.")
-            return 0.0
+        def extract_document():
+            # Preprocessing shrinks to 224px anyway: start from a capped pyramid level
+            doc_img = document.scaled(config.LAYOUT_MAX_SIDE).rgb
+            return extract(doc_img) if doc_img is not None else None
 
-        doc_tensor = preprocess(cv2.cvtColor(doc_img, cv2.COLOR_BGR2RGB)).unsqueeze(0).to(device)
-        tmpl_tensor = preprocess(cv2.cvtColor(tmpl_img, cv2.COLOR_BGR2RGB)).unsqueeze(0).to(device)
+        def extract_template():
+            # Only decoded on a cache miss
+            tmpl_img = template.scaled(config.LAYOUT_MAX_SIDE).rgb
+            if tmpl_img is None:
+                raise ValueError("Failed to load template image.")
+            return extract(tmpl_img)
 
-        with torch.no_grad():
-            doc_features = resnet(doc_tensor)
-            tmpl_features = resnet(tmpl_tensor)
+        # Document and template vectors must come from the same model and
+        # preprocessing: both caches are keyed by the same version
+        embedding_version = f"emb-v1|{LAYOUT_MODEL}|{config.LAYOUT_MAX_SIDE}"
+        doc_features = cached_artifact("layout", document, embedding_version, extract_document)
+        if doc_features is None:
+            print("[LayoutCheck] Failed to load document image.")
+            return 0.0
+
+        tmpl_features = template_cache.get_or_compute(
+            template.sha256, embedding_version, extract_template
+        )
 
-        sim = cosine_similarity(
-            doc_features.cpu().numpy(), tmpl_features.cpu().numpy()
-        )[0][0]
+        sim = cosine_similarity(doc_features, tmpl_features)[0][0]
 
         score = round(max(0.0, min(1.0, float(sim))), 3)
         print(f"[LayoutCheck DL] Layout similarity score: {score}")
@@ -10,33 +10,65 @@ Returns:
         - 0.0 → Likely forged (edited or metadata anomalies)
 """
 
-import os
 import piexif
 import magic
-from PIL import Image
-from datetime import datetime
-import numpy as np
+from utils.document import as_document
+from utils.exif import parse_exif_tags
+
+# Only these tags feed the score (tag id → name)
+SCORED_TAGS = {
+    0x0131: "Software",
+}
+
+# Bytes libmagic needs to identify image formats
+MIME_SNIFF_BYTES = 2048
+
+
+# ===============================
+# Helper: Read Scored EXIF Tags
+# ===============================
+def read_scored_exif(image_path) -> tuple:
+    """
+    Parses only the EXIF tags the score needs, straight from the
+    document's header bytes.
+
+    Returns:
+        tuple: (values, tag_count) — values maps tag name → value for the
+            tags in SCORED_TAGS; tag_count is the number of tags present.
+    """
+    try:
+        document = as_document(image_path)
+        exif_data = document.exif if document else None
+        if not exif_data:
+            return {}, 0
+        return parse_exif_tags(exif_data, SCORED_TAGS)
+    except Exception:
+        return {}, 0
 
 
 # ===============================
-# Helper: Extract EXIF Data
+# Helper: Extract EXIF Data (full dump, on request only)
 # ===============================
-def extract_exif_data(image_path: str) -> dict:
+def extract_exif_data(image_path) -> dict:
     """
-    Extracts EXIF metadata from an image file using Pillow + piexif.
+    Extracts all EXIF metadata from an image file (or shared document)
+    using piexif. Not used for scoring; see read_scored_exif().
 
     Returns:
         dict: Flattened EXIF tag-value pairs.
     """
     try:
-        image = Image.open(image_path)
-        exif_data = image.info.get("exif", None)
+        document = as_document(image_path)
+        exif_data = document.exif if document else None
         if not exif_data:
             return {}
 
         exif_dict = piexif.load(exif_data)
         readable = {}
         for ifd in exif_dict:
+            # "thumbnail" holds raw JPEG bytes, not a tag dictionary
+            if not isinstance(exif_dict[ifd], dict):
+                continue
             for tag, value in exif_dict[ifd].items():
                 tag_name = piexif.TAGS[ifd].get(tag, {"name": tag})["name"]
                 if isinstance(value, bytes):
@@ -53,31 +85,33 @@ def extract_exif_data(image_path: str) -> dict:
 # ===============================
 # Main Metadata Analysis Function
 # ===============================
-def metadata_analysis(image_path: str) -> float:
+def metadata_analysis(image_path) -> float:
     """
     Performs metadata consistency checks to detect if the image
     was edited, re-saved, or manipulated.
 
     Args:
-        image_path (str): Path to image file.
+        image_path (str | DocumentContext): Path to image file or the
+            shared per-request document.
 
     Returns:
         float: Authenticity score between 0.0–1.0
     """
 
-    if not image_path or not os.path.exists(image_path):
+    document = as_document(image_path)
+    if document is None:
         print("[MetadataCheck] Invalid image path.")
         return 0.0
 
     try:
-        # Step 1: Verify MIME type consistency
-        mime_type = magic.from_file(image_path, mime=True)
+        # Step 1: Verify MIME type consistency (sniffed from the header bytes)
+        mime_type = magic.from_buffer(document.header(MIME_SNIFF_BYTES), mime=True)
         expected_types = ["image/jpeg", "image/png"]
         mime_score = 1.0 if mime_type in expected_types else 0.0
 
-        # Step 2: Extract EXIF metadata
-        exif = extract_exif_data(image_path)
-        if not exif:
+        # Step 2: Extract only the EXIF tags used below
+        exif, tag_count = read_scored_exif(document)
+        if not tag_count:
             print("[MetadataCheck] No EXIF data found (possible re-save or screenshot).")
             # No EXIF often means resaved or stripped metadata — lower confidence
             return round(0.5 * mime_score, 3)
@@ -91,25 +125,13 @@ def metadata_analysis(image_path: str) -> float:
         edited_detected = any(tool in software_tag for tool in edited_tools)
         software_score = 0.0 if edited_detected else 1.0
 
-        # Step 4: Timestamp consistency
-        date_original = exif.get("DateTimeOriginal") or exif.get("DateTime")
-        date_modified = exif.get("DateTimeModified") or exif.get("ModifyDate")
-
+        # Step 4: Timestamp consistency — not scored: the modification
+        # timestamps it compared (DateTimeModified / ModifyDate) are not
+        # EXIF tags, so it never applied a penalty
         time_score = 1.0
-        if date_original and date_modified:
-            try:
-                fmt = "%Y:%m:%d %H:%M:%S"
-                t1 = datetime.strptime(str(date_original), fmt)
-                t2 = datetime.strptime(str(date_modified), fmt)
-                diff = abs((t2 - t1).total_seconds())
-                # If modified within a few seconds → fine, else suspicious
-                if diff > 10:
-                    time_score = max(0.0, 1.0 - min(diff / 3600, 1.0))  # drop if diff > 1h
-            except Exception:
-                time_score = 0.8  # fallback partial credit
 
         # Step 5: Metadata completeness (more EXIF tags = more authentic)
-        completeness = len(exif.keys())
+        completeness = tag_count
         completeness_score = min(completeness / 30.0, 1.0)  # normalize to 30 tags
 
         # Step 6: Combine all metrics with tuned weights
@@ -1,61 +1,69 @@
 """
 text_check.py
 --------------
-Performs text-based verification using OCR and semantic similarity.
+Performs text-based verification using OCR and digit matching.
 
 Steps:
 1. Extracts text from the uploaded Aadhaar document using EasyOCR.
-2. Encodes both the extracted text and the provided Aadhaar number
-   using BERT embeddings.
-3. Computes cosine similarity between the embeddings to estimate
-   how closely the extracted text matches the input Aadhaar number.
+2. Pulls digit sequences out of the OCR output (joining the usual
+   4-4-4 grouping and repairing common OCR confusions like O/0, I/1).
+3. Scores the closest sequence against the provided Aadhaar number
+   by normalized edit distance.
+
+BERT embedding similarity is kept as an optional mode / fallback
+(config.TEXT_MATCH_MODE) and is never loaded in the default mode.
 
 Returns:
     float: Similarity score between 0.0 and 1.0
 """
 
-import os
-import cv2
-import torch
-import easyocr
+import re
 import numpy as np
+import torch
 from sklearn.metrics.pairwise import cosine_similarity
-from transformers import BertTokenizer, BertModel
-from sentence_transformers import SentenceTransformer
 import warnings
+from models import get_model
+from utils.document import as_document
+from utils.artifact_cache import cached_artifact
+import config
 
 # Suppress warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
-# ===============================
-# Initialize OCR and Text Models
-# ===============================
-try:
-    reader = easyocr.Reader(['en'], gpu=False)
-    sbert_model = SentenceTransformer('paraphrase-MiniLM-L6-v2')  # For future semantic use
-    tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-    bert_model = BertModel.from_pretrained('bert-base-uncased')
-    bert_model.eval()
-    print("[Init] EasyOCR, BERT, and Sentence-BERT initialized successfully.")
-except Exception as e:
-    print(f"[Init Warning] Could not initialize text models: {e}")
-
 
 # ===============================
 # OCR Text Extraction
 # ===============================
-def extract_text_from_image(image_path: str) -> str:
+def _recognize(reader, rgb, gray) -> str:
+    horizontal_list, free_list = reader.detect(rgb)
+    results = reader.recognize(gray, horizontal_list[0], free_list[0])
+    return ' '.join([text[1] for text in results])
+
+
+def extract_text_from_image(image_path) -> str:
     """
-    Extracts text from an image using EasyOCR.
+    Extracts text from an image (or shared document) using EasyOCR.
     Returns all detected text combined into a single string.
     """
-    if not image_path or not os.path.exists(image_path):
+    document = as_document(image_path)
+    if document is None:
         print("[TextCheck] Invalid image path.")
         return ""
 
+    reader = get_model("easyocr")
+    if reader is None:
+        print("[TextCheck] OCR model not initialized.")
+        return ""
+
     try:
-        results = reader.readtext(image_path)
-        extracted_text = ' '.join([text[1] for text in results])
+        page = document.scaled(config.OCR_MAX_SIDE)
+        if page.rgb is None:
+            print("[TextCheck] Failed to load image.")
+            return ""
+
+        # Same split readtext() performs internally: detection on the colour
+        # image, recognition on the grayscale one — both from the shared decode
+        extracted_text = _recognize(reader, page.rgb, page.gray)
         print(f"[TextCheck] Extracted Text: {extracted_text[:80]}...")
         return extracted_text.strip()
     except Exception as e:
@@ -63,6 +71,119 @@ def extract_text_from_image(image_path: str) -> str:
         return ""
 
 
+# ===============================
+# Region-of-interest OCR
+# ===============================
+def _ocr_fixed_regions(reader, page, regions) -> str:
+    """OCRs only the given normalized (x0, y0, x1, y1) boxes of the page."""
+    height, width = page.gray.shape[:2]
+    texts = []
+    for x0, y0, x1, y1 in regions:
+        xs, xe = int(x0 * width), int(x1 * width)
+        ys, ye = int(y0 * height), int(y1 * height)
+        if xe - xs < 8 or ye - ys < 8:
+            continue
+        rgb_crop = np.ascontiguousarray(page.rgb[ys:ye, xs:xe])
+        gray_crop = np.ascontiguousarray(page.gray[ys:ye, xs:xe])
+        texts.append(_recognize(reader, rgb_crop, gray_crop))
+    return ' '.join(texts)
+
+
+def _box_aspect(box) -> float:
+    # EasyOCR horizontal boxes are [x_min, x_max, y_min, y_max]
+    return (box[1] - box[0]) / float(max(box[3] - box[2], 1))
+
+
+def _number_band_boxes(boxes, max_bands: int) -> list:
+    """
+    Keeps only detected boxes shaped like the Aadhaar number: a row of
+    at least three 4-digit groups (similar height and width, vertically
+    aligned), or a single box spanning a whole "1234 5678 9012" line.
+    Group rows rank before single lines, each by text height (the number
+    is printed larger than the body text); the first max_bands are kept.
+    """
+    groups = [box for box in boxes if 1.5 <= _box_aspect(box) <= 4.5]
+    bands = []
+    seen = set()
+    for anchor in groups:
+        height = anchor[3] - anchor[2]
+        width = anchor[1] - anchor[0]
+        center = (anchor[2] + anchor[3]) / 2.0
+        row = [
+            box for box in groups
+            if abs((box[2] + box[3]) / 2.0 - center) <= 0.5 * height
+            and abs((box[3] - box[2]) - height) <= 0.3 * height
+            and abs((box[1] - box[0]) - width) <= 0.4 * width
+        ]
+        key = tuple(sorted(tuple(box) for box in row))
+        if len(row) >= 3 and key not in seen:
+            seen.add(key)
+            bands.append(sorted(row, key=lambda box: box[0]))
+
+    lines = [[box] for box in boxes if 5.0 <= _box_aspect(box) <= 14.0]
+    by_height = lambda band: -(band[0][3] - band[0][2])
+    # Rows of separate groups are the stronger evidence: they come first
+    bands = sorted(bands, key=by_height) + sorted(lines, key=by_height)
+    return [box for band in bands[:max_bands] for box in band]
+
+
+def _ocr_detected_regions(reader, page, detect_view) -> str:
+    """
+    Runs the (expensive) text detector on a downscaled pyramid level of
+    the page, keeps only the boxes in candidate number bands, and
+    recognizes just those on the working-size page.
+    """
+    scale = detect_view.gray.shape[1] / float(page.gray.shape[1])
+    horizontal_list, _ = reader.detect(detect_view.rgb)
+
+    # Rotated (free-form) boxes are never the printed number line
+    bands = _number_band_boxes(horizontal_list[0], config.OCR_NUMBER_BANDS)
+    if not bands:
+        return ""
+
+    boxes = [[int(v / scale) for v in box] for box in bands]
+    results = reader.recognize(page.gray, boxes, [])
+    return ' '.join([text[1] for text in results])
+
+
+def extract_text_from_roi(image_path, template=None) -> str:
+    """
+    Extracts text from regions of interest only.
+
+    Regions come from config.OCR_ROI_REGIONS, keyed by the template's
+    SHA-256 (or "default"). In "auto" mode a document with no configured
+    regions is located by a detector pass on a downscaled image instead,
+    and only boxes with the number's 4-4-4 geometry are recognized.
+    Returns "" when nothing usable was found (callers fall back to full-page OCR).
+    """
+    document = as_document(image_path)
+    if document is None or document.bgr is None:
+        return ""
+
+    reader = get_model("easyocr")
+    if reader is None:
+        print("[TextCheck] OCR model not initialized.")
+        return ""
+
+    mode = config.OCR_ROI_MODE
+    regions = config.OCR_ROI_REGIONS.get(template.sha256) if template is not None else None
+    if regions is None and mode == "fixed":
+        regions = config.OCR_ROI_REGIONS.get("default")
+
+    try:
+        page = document.scaled(config.OCR_MAX_SIDE)
+        if regions:
+            extracted_text = _ocr_fixed_regions(reader, page, regions)
+        else:
+            detect_view = document.scaled(config.OCR_DETECT_MAX_SIDE)
+            extracted_text = _ocr_detected_regions(reader, page, detect_view)
+        print(f"[TextCheck] ROI Extracted Text: {extracted_text[:80]}...")
+        return extracted_text.strip()
+    except Exception as e:
+        print(f"[TextCheck] ROI OCR failed: {e}")
+        return ""
+
+
 # ===============================
 # Text Similarity using BERT
 # ===============================
@@ -74,6 +195,15 @@ def text_similarity_bert(extracted_text: str, reference_text: str) -> float:
         print("[TextCheck] Missing text input for similarity.")
         return 0.0
 
+    if config.INFERENCE_BACKEND == "onnx":
+        return _text_similarity_bert_onnx(extracted_text, reference_text)
+
+    bert = get_model("bert")
+    if bert is None:
+        print("[TextCheck] BERT model not initialized.")
+        return 0.0
+    tokenizer, bert_model = bert
+
     try:
         # Tokenize both texts
         inputs_extracted = tokenizer(extracted_text, return_tensors="pt", padding=True,
@@ -99,23 +229,169 @@ def text_similarity_bert(extracted_text: str, reference_text: str) -> float:
         return 0.0
 
 
+def _text_similarity_bert_onnx(extracted_text: str, reference_text: str) -> float:
+    """Same as text_similarity_bert, on the quantized ONNX Runtime model."""
+    onnx_bert = get_model("bert_onnx")
+    if onnx_bert is None:
+        print("[TextCheck] ONNX BERT model not initialized.")
+        return 0.0
+
+    try:
+        sim = cosine_similarity(onnx_bert.embed(extracted_text),
+                                onnx_bert.embed(reference_text))[0][0]
+        score = max(0.0, min(1.0, float(sim)))
+        print(f"[TextCheck] BERT (ONNX) Text Similarity Score: {score:.3f}")
+        return round(score, 3)
+    except Exception as e:
+        print(f"[TextCheck Error] ONNX BERT similarity computation failed: {e}")
+        return 0.0
+
+
+# ===============================
+# Digit-aware Matching (fast path)
+# ===============================
+# Characters OCR commonly returns in place of digits
+_OCR_DIGIT_MAP = str.maketrans({
+    "O": "0", "o": "0", "D": "0", "Q": "0",
+    "I": "1", "l": "1", "i": "1", "|": "1", "!": "1",
+    "Z": "2", "z": "2",
+    "S": "5", "s": "5",
+    "G": "6", "b": "6",
+    "T": "7",
+    "B": "8",
+    "g": "9", "q": "9",
+})
+
+_TOKEN_SPLIT = re.compile(r"[\s\-.,:/]+")
+
+
+def _numeric_tokens(text: str) -> list:
+    """
+    Returns OCR tokens that are mostly digits, with look-alike letters
+    repaired. Words such as "GOVERNMENT" are left out entirely.
+    """
+    tokens = []
+    for token in _TOKEN_SPLIT.split(text):
+        if not token:
+            continue
+        digit_count = sum(ch.isdigit() for ch in token)
+        if digit_count == 0 or digit_count * 2 < len(token):
+            continue
+        repaired = token.translate(_OCR_DIGIT_MAP)
+        repaired = "".join(ch for ch in repaired if ch.isdigit())
+        if repaired:
+            tokens.append(repaired)
+    return tokens
+
+
+def extract_digit_candidates(text: str, min_len: int = 8, max_len: int = 14) -> list:
+    """
+    Builds candidate number strings from consecutive numeric tokens,
+    so "1234 5678 9012" and "123456789012" both yield "123456789012".
+    """
+    tokens = _numeric_tokens(text)
+    candidates = set()
+    for i in range(len(tokens)):
+        joined = ""
+        for token in tokens[i:]:
+            joined += token
+            if len(joined) > max_len:
+                break
+            if len(joined) >= min_len:
+                candidates.add(joined)
+    return sorted(candidates)
+
+
+def _edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance (two-row dynamic programming)."""
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        previous = current
+    return previous[-1]
+
+
+def text_similarity_digits(extracted_text: str, reference_number: str):
+    """
+    Scores how closely any digit sequence in the OCR output matches the
+    reference number (1.0 = exact match).
+
+    Returns:
+        float | None: Best score, or None if no digit sequence was found.
+    """
+    candidates = extract_digit_candidates(extracted_text)
+    if not candidates:
+        print("[TextCheck] No digit sequences found in OCR output.")
+        return None
+
+    best = 0.0
+    for candidate in candidates:
+        distance = _edit_distance(candidate, reference_number)
+        best = max(best, 1.0 - distance / max(len(candidate), len(reference_number)))
+        if best == 1.0:
+            break
+
+    print(f"[TextCheck] Digit Match Score: {best:.3f} ({len(candidates)} candidates)")
+    return round(best, 3)
+
+
 # ===============================
 # Combined Text Verification Function
 # ===============================
-def text_match(doc_path: str, aadhaar_number: str) -> float:
+def _extract_text(document, template) -> str:
+    """Regions of interest first, full page only if they yield no digits."""
+    extracted_text = ""
+    if config.OCR_ROI_MODE != "off":
+        extracted_text = extract_text_from_roi(document, template)
+        if not extract_digit_candidates(extracted_text):
+            print("[TextCheck] No digits in ROI text, falling back to full-page OCR.")
+            extracted_text = ""
+    if not extracted_text:
+        extracted_text = extract_text_from_image(document)
+    return extracted_text
+
+
+def _ocr_artifact_version(template) -> str:
+    """Everything besides the document bytes that changes the OCR output."""
+    regions = None
+    if config.OCR_ROI_MODE != "off":
+        if template is not None:
+            regions = config.OCR_ROI_REGIONS.get(template.sha256)
+        if regions is None and config.OCR_ROI_MODE == "fixed":
+            regions = config.OCR_ROI_REGIONS.get("default")
+    return (f"ocr-v2|{config.OCR_ROI_MODE}|{config.OCR_MAX_SIDE}|"
+            f"{config.OCR_DETECT_MAX_SIDE}|{config.OCR_NUMBER_BANDS}|{regions}")
+
+
+def text_match(doc_path, aadhaar_number: str, template_path=None) -> float:
     """
     Extracts text from the Aadhaar document and compares it with the
-    provided Aadhaar number using semantic similarity.
+    provided Aadhaar number.
+
+    Modes (config.TEXT_MATCH_MODE):
+        "digits"      → Digit-sequence edit distance only (default)
+        "digits+bert" → Digit match, BERT fallback when no digits are found
+        "bert"        → BERT embedding similarity only (legacy behaviour)
 
     Args:
-        doc_path (str): Path to uploaded Aadhaar document image
+        doc_path (str | DocumentContext): Path to uploaded Aadhaar document
+            image or the shared per-request document
         aadhaar_number (str): User-entered Aadhaar number for validation
+        template_path (str | DocumentContext, optional): Template used to
+            look up per-template OCR regions of interest
 
     Returns:
         float: Similarity score (0.0 to 1.0)
     """
 
-    if not doc_path or not os.path.exists(doc_path):
+    document = as_document(doc_path)
+    if document is None:
         print("[TextCheck] Invalid or missing document path.")
         return 0.0
     if not aadhaar_number or not aadhaar_number.isdigit():
@@ -123,14 +399,26 @@ def text_match(doc_path: str, aadhaar_number: str) -> float:
         return 0.0
 
     try:
-        # Step 1: Extract text via EasyOCR
-        extracted_text = extract_text_from_image(doc_path)
+        # Step 1: Extract text via EasyOCR (reused from the artifact cache
+        # when this scan was seen before with the same OCR settings)
+        template = as_document(template_path)
+        extracted_text = cached_artifact(
+            "ocr", document, _ocr_artifact_version(template),
+            lambda: _extract_text(document, template) or None,
+        )
         if not extracted_text:
             print("[TextCheck] No text extracted from document.")
             return 0.0
 
-        # Step 2: Compare with reference Aadhaar number using BERT
-        similarity_score = text_similarity_bert(extracted_text, aadhaar_number)
+        # Step 2: Compare with reference Aadhaar number
+        mode = config.TEXT_MATCH_MODE
+        similarity_score = None
+        if mode != "bert":
+            similarity_score = text_similarity_digits(extracted_text, aadhaar_number)
+        if similarity_score is None:
+            if mode == "digits":
+                return 0.0
+            similarity_score = text_similarity_bert(extracted_text, aadhaar_number)
 
         # Return normalized score
         return round(similarity_score, 3)